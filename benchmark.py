@@ -0,0 +1,137 @@
+import time
+import random
+
+from modules.noteSolver import *
+from modules.noteConstraints import SearchMonitor
+
+# Chords of the sample progressions, plus a few wide extended chords
+BENCHMARK_CHORDS = ["B:min7", "E:7", "A:maj7", "D:min7", "G:7", "C:maj7", "F:min7", "Eb:min6", "Ab:maj7",
+                    "G:13", "C:maj9", "D:7#11", "G:7sus4"]
+
+# Previous chord used for the smooth mode
+PREVIOUS_CHORD = [48, 55, 59, 64]
+
+
+'''
+Search nodes visited and time per chord of the CSP for each mode, enumerating every solution.
+Jazz and rootless voicings are built in closed form by produceNotes, whose time is reported next to the CSP.
+'''
+def benchmarkSolver(repeats=5):
+    print(f"{'mode':<10}{'chord':<10}{'solutions':>10}{'nodes':>10}{'csp ms':>10}{'closed ms':>10}")
+    for mode in ["simple", "jazz", "rootless", "smooth"]:
+        notes_so_far = [PREVIOUS_CHORD] if mode == "smooth" else []
+        for current_chord in BENCHMARK_CHORDS:
+            try:
+                voicingFamilyName(current_chord.split(':')[1])
+            except ValueError:
+                if mode in ["jazz", "rootless"]:
+                    continue
+
+            if mode in ["jazz", "rootless"]:
+                voicings = JAZZ_VOICINGS if mode == "jazz" else ROOTLESS_VOICINGS
+                chord_structure = chooseVoicingFamily(voicings, current_chord.split(':')[1])[0]
+            else:
+                chord_structure = None
+
+            total_time = 0
+            for _ in range(repeats):
+                monitor = SearchMonitor()
+                start = time.perf_counter()
+                problem, note_vars = buildProblem(current_chord, notes_so_far, mode, chord_structure, rng=random.Random(0), monitor=monitor)
+                solutions = problem.getSolutions()
+                total_time += time.perf_counter() - start
+
+            closed_form = ""
+            if chord_structure is not None:
+                start = time.perf_counter()
+                for _ in range(repeats):
+                    structureVoicing(current_chord, mode, chord_structure)
+                closed_form = f"{(time.perf_counter() - start) / repeats * 1000:.3f}"
+
+            print(f"{mode:<10}{current_chord:<10}{len(solutions):>10}{monitor.nodes:>10}{total_time / repeats * 1000:>10.3f}{closed_form:>10}")
+
+
+'''
+Throughput of produceAllNotesBatch, in progressions per second, against the number of workers.
+'''
+def benchmarkBatch(count=200, worker_counts=(1, 2, 4), mode="smooth"):
+    rng = random.Random(0)
+    progressions = [[rng.choice(BENCHMARK_CHORDS) for _ in range(8)] for _ in range(count)]
+
+    print(f"{'workers':>8}{'seconds':>10}{'prog/s':>10}")
+    for workers in worker_counts:
+        SOLUTION_CACHE.clear()
+        start = time.perf_counter()
+        produceAllNotesBatch(progressions, mode, workers=workers, fallback=True)
+        elapsed = time.perf_counter() - start
+        print(f"{workers:>8}{elapsed:>10.2f}{count / elapsed:>10.1f}")
+
+
+'''
+Integer pitch core (modules/utils.py) against the music21 Pitch operations it replaces, in microseconds per call.
+'''
+def benchmarkPitch(repeats=10000):
+    import timeit
+    import subprocess
+    import sys
+
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "import music21"], check=True)
+    music21_import = time.perf_counter() - start
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "import modules.utils"], check=True)
+    utils_import = time.perf_counter() - start
+
+    from music21 import pitch
+
+    def music21Respell():
+        new_pitch = pitch.Pitch()
+        new_pitch.midi = pitch.Pitch("Bb").midi - 4
+        return new_pitch.name
+
+    def music21Octaves():
+        notes = []
+        note_val = pitch.Pitch(pitch.Pitch("Eb").midi + 7)
+        while note_val.midi >= LOWEST_NOTE:
+            note_val.midi -= 12
+        note_val.midi += 12
+        while note_val.midi <= HIGHEST_NOTE:
+            notes.append(note_val.midi)
+            note_val.midi += 12
+        return notes
+
+    cases = [
+        ("name to midi", lambda: pitch.Pitch("Bb").midi, lambda: noteNameToMidi("Bb")),
+        ("respell midi", music21Respell, lambda: midiToName(noteNameToMidi("Bb") - 4)),
+        ("octave expansion", music21Octaves, lambda: octaveExpansion((noteNameToMidi("Eb") + 7) % 12, LOWEST_NOTE, HIGHEST_NOTE)),
+    ]
+
+    print(f"{'operation':<20}{'music21 us':>12}{'utils us':>12}")
+    print(f"{'import (s)':<20}{music21_import:>12.3f}{utils_import:>12.3f}")
+    for name, music21_call, utils_call in cases:
+        music21_time = timeit.timeit(music21_call, number=repeats) / repeats * 1e6
+        utils_time = timeit.timeit(utils_call, number=repeats) / repeats * 1e6
+        print(f"{name:<20}{music21_time:>12.2f}{utils_time:>12.2f}")
+
+    prepare_time = timeit.timeit(lambda: prepare_note_dict("Eb", "min9"), number=repeats) / repeats * 1e6
+    print(f"{'prepare_note_dict':<20}{'':>12}{prepare_time:>12.2f}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Note solver benchmarks")
+    parser.add_argument('benchmark', nargs='?', choices=['solver', 'batch', 'pitch'], default='solver', help="Benchmark to run")
+    parser.add_argument('--repeats', type=int, default=5, help="Runs averaged per measurement")
+    parser.add_argument('--count', type=int, default=200, help="Progressions voiced by the batch benchmark")
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4], help="Worker counts for the batch benchmark")
+    parser.add_argument('--mode', default="smooth", help="Voicing mode for the batch benchmark")
+
+    args = parser.parse_args()
+
+    if args.benchmark == 'solver':
+        benchmarkSolver(args.repeats)
+    elif args.benchmark == 'batch':
+        benchmarkBatch(args.count, args.workers, args.mode)
+    elif args.benchmark == 'pitch':
+        benchmarkPitch()
@@ -7,6 +7,8 @@ import json
 # Custom imports (replace with actual implementations)
 from modules.rant import *
 from modules.noteSolver import *
+from modules.liveVoicer import LiveVoicer, midiChordSymbols
+from modules.sections import detectSections, sectionChordSpans, sectionsFromForm
 
 def string_to_dict(string):
     try:
@@ -22,35 +24,6 @@ def formatProgression(progression):
         formatted_progression[key] = formatted_chords
     return formatted_progression
 
-def formatChord(chord):
-    if chord is None:
-        return None
-    
-    root = chord[0]
-    formatted_chord = ""
-    
-    # Check for accidentals (sharp or flat)
-    if len(chord) > 1 and (chord[1] == '#' or chord[1] == 'b'):
-        root += chord[1]
-        remainder = chord[2:]
-    else:
-        remainder = chord[1:]
-    
-    # Ensure proper formatting for minor, major, and diminished chords
-    if "m" in remainder and not any(sub in remainder for sub in ["maj", "min", "dim"]):
-        remainder = remainder.replace("m", "min")
-    
-    if "M" in remainder and "Maj" not in remainder:
-        remainder = remainder.replace("M", "maj")
-        
-    if remainder == "":
-        remainder = "maj"
-    
-    # Form the formatted chord
-    formatted_chord = root + ":" + remainder.lower()
-    
-    return formatted_chord
-
 def generate_chord_symbols(prompt, client):
     try:
         response = client.chat.completions.create(
@@ -104,14 +77,13 @@ def generate_chords(filename):
     progression_raw = string_to_dict(generate_chord_symbols("give me a jazz chord progression", client))
     save_to_file(progression_raw, filename)
 
-def process_chords(filename):
+def process_chords(filename, stats_filename=None, profile=None, previous_filename=None, all_keys=None, form=None):
     progression_raw = load_from_file(filename)
     formatted_progression = formatProgression(progression_raw)
     
     list_of_chords = [item for sublist in list(formatted_progression.values()) for item in sublist]
-    while None in list_of_chords:
-        print("None found in progression. Rerunning...")
-        list_of_chords = [item for sublist in list(formatted_progression.values()) for item in sublist]
+    if None in list_of_chords:
+        raise ValueError("None found in progression.")
     
     new_prog = rant(formatted_progression, 1)
     print("new_prog:")
@@ -124,39 +96,107 @@ def process_chords(filename):
     
     print(list_of_voicings)
     
-    solution_found = False
-    while not solution_found:
-        try:
-            formatted_solution = produceAllNotes(chords_list, "simple", list_of_voicings)
-            solution_found = True
-        except ValueError as e:
-            print(f"Error occurred: {e}. Retrying...")
+    # every bar lasts a whole note, shared by its chords
+    durations = [4.0 / len(chords) for chords in formatted_progression.values() for _ in chords]
+    
+    if all_keys:
+        process_all_keys(chords_list, list_of_voicings, durations, all_keys, stats_filename, profile)
+        return
+    
+    # voice every distinct section once; form is a string like "AABA", or "detect" to find the repeated bars
+    sections = None
+    if form:
+        bars = list(new_prog.values())
+        bar_sections = detectSections(bars) if form == "detect" else sectionsFromForm(form, len(bars))
+        print(f"Sections: {', '.join(f'{label} (bars {start + 1}-{stop})' for label, start, stop in bar_sections)}")
+        sections = sectionChordSpans(bar_sections, bars)
+    
+    # re-voice only what changed since the previous run, if it was the same length
+    previous_result, edited = None, None
+    if previous_filename and os.path.exists(previous_filename) and sections is None:
+        previous = load_from_file(previous_filename)
+        if len(previous["chords"]) == len(chords_list):
+            previous_result = previous["notes"]
+            edited = editedIndices(previous["chords"], chords_list)
+            print(f"Edited chords: {edited}")
+    
+    stats = SolverStats() if stats_filename else None
+    formatted_solution, relaxation = produceAllNotesWithFallback(chords_list, "simple", list_of_voicings, stats=stats, profile=profile,
+                                                                 previous_result=previous_result, edited=edited, sections=sections)
+    if previous_filename:
+        save_to_file({"chords": chords_list, "notes": formatted_solution}, previous_filename)
+    if stats:
+        stats.write_jsonl(stats_filename)
+    print(f"Solution found with relaxation: {relaxation}")
+    
+    voiced = VoicedProgression.fromLists(formatted_solution, durations)
+    voiced.writeMidi("output.mid")
+
+# Voices the progression in all 12 keys; output "files" writes one output_<key>.mid per key, "sections" a single
+# output.mid with the keys one after the other. Keys are named as if the progression were in C, as generate_chords asks.
+def process_all_keys(chords_list, list_of_voicings, durations, output, stats_filename=None, profile=None):
+    stats = SolverStats() if stats_filename else None
+    key_progressions, results = produceAllKeys(chords_list, "simple", list_of_voicings, stats=stats, profile=profile)
+    if stats:
+        stats.write_jsonl(stats_filename)
+    
+    voiced_keys = [VoicedProgression.fromLists(notes, durations) for notes, relaxation in results]
+    if output == "sections":
+        VoicedProgression.concatenate(voiced_keys).writeMidi("output.mid")
+    else:
+        for key, voiced in zip(INDEX_ROOTS, voiced_keys):
+            voiced.writeMidi(f"output_{key}.mid")
     
-    chord_index = 0
-    music_stream = stream.Stream()
+    for key, key_progression, (notes, relaxation) in zip(INDEX_ROOTS, key_progressions, results):
+        print(f"{key}: {key_progression} (relaxation: {relaxation})")
+
+def live_chords(filename, midi_in=None, midi_out=None, profile=None):
+    import mido
     
-    for key in formatted_progression.keys():
-        for _ in formatted_progression[key]:
-            c = chord.Chord(formatted_solution[chord_index], duration=duration.Duration(4.0 / len(formatted_progression[key])))
-            music_stream.append(c)
-            chord_index += 1
+    if midi_in:
+        chord_symbols = midiChordSymbols(mido.open_input(midi_in))
+    else:
+        progression = formatProgression(load_from_file(filename))
+        chord_symbols = [item for sublist in progression.values() for item in sublist]
     
-    music_stream.write("midi", "output.mid")
+    output = mido.open_output(midi_out) if midi_out else None
+    voicer = LiveVoicer(profile=profile)
+    for chord_symbol, notes, messages in voicer.stream(chord_symbols, output):
+        print(chord_symbol, notes)
 
 if __name__ == "__main__":
     import argparse
 
     parser = argparse.ArgumentParser(description="Chord Progression Generator")
-    parser.add_argument('action', nargs='?', choices=['generate', 'process'], help="Action to perform")
+    parser.add_argument('action', nargs='?', choices=['generate', 'process', 'index', 'live'], help="Action to perform")
     parser.add_argument('filename', nargs='?', default="sample.json", help="Filename for storing/loading chord progression")
+    parser.add_argument('--cache', default=None, help="JSON file for persisting solver solutions between runs")
+    parser.add_argument('--stats', default=None, help="JSON lines file for per-chord solver statistics")
+    parser.add_argument('--index', default=None, help="Directory of a precomputed voicing index; the 'index' action builds it")
+    parser.add_argument('--midi-in', default=None, help="MIDI input port the 'live' action reads chords from; the progression file otherwise")
+    parser.add_argument('--midi-out', default=None, help="MIDI output port the 'live' action plays the voicings on")
+    parser.add_argument('--previous', default=None, help="JSON file with the last processed progression; only the edited chords are voiced again")
+    parser.add_argument('--all-keys', default=None, choices=['files', 'sections'], help="Voice the progression in all 12 keys, into one MIDI file per key or one file with a section per key")
+    parser.add_argument('--sections', default=None, help="Song form, e.g. AABA, or 'detect' to find repeated bars; each distinct section is voiced once")
+    parser.add_argument('--profile', default=None, choices=list(PROFILES.keys()), help="Instrument range profile the voicings must fit in")
 
     args = parser.parse_args()
+    
+    if args.cache:
+        useDiskCache(args.cache)
+    
+    if args.index and args.action != 'index':
+        useVoicingIndex(args.index)
 
     if args.action is None:
         generate_chords(args.filename)
-        process_chords(args.filename)
+        process_chords(args.filename, args.stats, args.profile, args.previous, args.all_keys, args.sections)
     else:
         if args.action == 'generate':
             generate_chords(args.filename)
         elif args.action == 'process':
-            process_chords(args.filename)
+            process_chords(args.filename, args.stats, args.profile, args.previous, args.all_keys, args.sections)
+        elif args.action == 'index':
+            buildVoicingIndex(args.index or "voicing_index")
+        elif args.action == 'live':
+            live_chords(args.filename, args.midi_in, args.midi_out, args.profile)
@@ -0,0 +1,185 @@
+import random
+import time
+
+from modules.rant import rantChord
+from modules.noteSolver import *
+
+try:
+    import mido
+except ImportError:
+    mido = None
+
+'''
+Realtime reharmonization and voicing.
+
+Chord symbols come in one at a time, from any iterable (a list, a generator, stdin...) or from a MIDI input through
+midiChordSymbols. Each one goes through rantChord and produceNotes as soon as it arrives, and comes out as MIDI
+note_off / note_on messages, sent to an output port if there is one. The voicer keeps the previous voicing and
+reuses the solver caches, so a chord costs the same as it would inside a whole progression.
+
+Latency is bounded by time_budget: the relaxation ladder is tried within it, and fallbackVoicing answers once it
+runs out. MIDI input and output need mido; plain chord symbols in and (notes, messages) out do not.
+'''
+
+
+class LiveVoicer:
+    def __init__(self, mode="smooth", level=1, time_budget=0.05, profile=None, channel=0, velocity=80, rng=None, stats=None):
+        self.mode = mode
+        self.level = level
+        self.time_budget = time_budget
+        self.profile = profile
+        self.channel = channel
+        self.velocity = velocity
+        self.rng = rng or random
+        self.stats = stats
+        self.notes_so_far = []
+        self.sounding = []
+
+    '''
+    Voices one chord symbol, as written ("Dm7") or formatted ("D:min7").
+    returns:
+        chord: the chord symbol after reharmonization.
+        notes: its voicing, lowest note first.
+    '''
+    def voice(self, chord_symbol):
+        chord = chord_symbol if ':' in chord_symbol else formatChord(chord_symbol)
+        chord = rantChord(chord, self.level)
+
+        deadline = time.perf_counter() + self.time_budget
+        notes = None
+        for relaxation_name, relaxations in RELAXATION_LADDER:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            if self.stats is not None:
+                self.stats.relaxation = relaxation_name
+            try:
+                notes = produceNotes(chord, self.notes_so_far, self.mode, relaxations=relaxations, rng=self.rng, stats=self.stats,
+                                     time_budget=remaining, profile=self.profile)
+                break
+            except ValueError:
+                continue
+
+        if notes is None:
+            notes = fallbackVoicing(chord, self.mode, self.profile)
+
+        # only the previous chord matters to the smooth and voiceleading modes
+        self.notes_so_far = [notes]
+        return chord, notes
+
+    '''
+    MIDI messages that release the sounding chord and strike the given notes.
+    '''
+    def chordMessages(self, notes):
+        messages = [mido.Message('note_off', channel=self.channel, note=note, velocity=0) for note in self.sounding]
+        messages += [mido.Message('note_on', channel=self.channel, note=note, velocity=self.velocity) for note in notes]
+        self.sounding = list(notes)
+        return messages
+
+    def allNotesOff(self):
+        messages = [mido.Message('note_off', channel=self.channel, note=note, velocity=0) for note in self.sounding]
+        self.sounding = []
+        return messages
+
+    '''
+    Voices every chord symbol of chord_symbols as it arrives.
+    params:
+        chord_symbols: any iterable of chord symbols; it may block between chords.
+        output: optional mido output port (anything with send()); the messages are sent as soon as a chord is voiced.
+
+    yields:
+        (chord, notes, messages) for every chord; without mido, messages is empty.
+    '''
+    def stream(self, chord_symbols, output=None):
+        try:
+            for chord_symbol in chord_symbols:
+                chord, notes = self.voice(chord_symbol)
+                messages = self.chordMessages(notes) if mido is not None else []
+                if output is not None:
+                    for message in messages:
+                        output.send(message)
+                yield chord, notes, messages
+        finally:
+            if mido is not None and output is not None:
+                for message in self.allNotesOff():
+                    output.send(message)
+
+    def reset(self):
+        self.notes_so_far = []
+        self.sounding = []
+
+
+'''
+Chord symbol of a set of midi notes: the chord type of CHORD_FORMULAS whose pitch classes are exactly those of the
+notes, with its root on the lowest note if possible. Returns None if no chord type matches.
+'''
+def identifyChord(notes):
+    if not notes:
+        return None
+    pitch_classes = set(note % 12 for note in notes)
+    bass = min(notes) % 12
+    roots = [bass] + [pitch_class for pitch_class in sorted(pitch_classes) if pitch_class != bass]
+    for root in roots:
+        for chord_type, intervals in CHORD_FORMULAS.items():
+            if set((root + interval) % 12 for interval in intervals) == pitch_classes:
+                return f"{spellPitchClass(root, 'flat')}:{chord_type}"
+    return None
+
+
+'''
+Chord symbols from a stream of mido messages: an input port, a MidiFile (iterated directly, as play() drops meta
+messages), or any iterable of messages. Text, marker and lyrics meta messages are read as chord symbols. Notes held down together are recognized with
+identifyChord. A chord is only emitted once the held notes settle: when no note has been added for settle seconds,
+when a note is released, or when the messages end. A block chord whose notes arrive a few milliseconds apart is
+then one chord, not a triad followed by its seventh chord.
+Time comes from the time attribute of the messages (the seconds since the previous one, as a MidiFile yields them);
+an input port is polled instead, against the clock.
+'''
+def midiChordSymbols(messages, min_notes=3, settle=0.03):
+    held = set()
+    last_chord = None
+    pending = None
+    pending_since = 0.0
+    for message, now in _timedMessages(messages):
+        if pending is not None and now - pending_since >= settle:
+            last_chord, pending = pending, None
+            yield last_chord
+        if message is None:
+            continue
+        
+        if message.is_meta:
+            if message.type in ('text', 'marker', 'lyrics') and message.text.strip():
+                if pending is not None:
+                    last_chord, pending = pending, None
+                    yield last_chord
+                yield message.text.strip()
+            continue
+        
+        if message.type == 'note_on' and message.velocity > 0:
+            held.add(message.note)
+            chord = identifyChord(held) if len(held) >= min_notes else None
+            pending = chord if chord != last_chord else None
+            pending_since = now
+        elif message.type in ('note_off', 'note_on'):
+            held.discard(message.note)
+            if pending is not None:
+                last_chord, pending = pending, None
+                yield last_chord
+            if not held:
+                last_chord = None
+
+
+# (message, time) pairs; None messages are clock ticks while a port has nothing, and one last tick ends the stream
+def _timedMessages(messages, poll_interval=0.001):
+    if hasattr(messages, 'poll'):
+        while True:
+            message = messages.poll()
+            yield message, time.perf_counter()
+            if message is None:
+                time.sleep(poll_interval)
+    
+    now = 0.0
+    for message in messages:
+        now += message.time
+        yield message, now
+    yield None, float("inf")
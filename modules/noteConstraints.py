@@ -0,0 +1,136 @@
+import time
+
+from constraint import Constraint, Unassigned
+
+'''
+Specialized python-constraint constraints for the note solver.
+
+Unlike FunctionConstraint wrapping a lambda, these know their own logic, so when the solver runs with
+forward checking they hide the values of unassigned variables that can no longer be used. Limits on a single note,
+such as staying near the previous chord, are not constraints: buildProblem filters the domains before the search
+(see nearPreviousNotes in modules/noteSolver.py).
+'''
+
+
+'''
+Notes strictly ascend in the order of the given variables.
+'''
+class OrderedChainConstraint(Constraint):
+    def __call__(self, variables, domains, assignments, forwardcheck=False, _unassigned=Unassigned):
+        values = [assignments.get(variable, _unassigned) for variable in variables]
+
+        # assigned notes must leave room for the unassigned ones between them
+        previous = None
+        for i, value in enumerate(values):
+            if value is _unassigned:
+                continue
+            if previous is not None and value - previous[1] < i - previous[0]:
+                return False
+            previous = (i, value)
+
+        if forwardcheck:
+            # bounds from the nearest assigned variable on each side
+            lower = [None] * len(values)
+            upper = [None] * len(values)
+            last = None
+            for i, value in enumerate(values):
+                if value is not _unassigned:
+                    last = (i, value)
+                elif last is not None:
+                    lower[i] = last[1] + (i - last[0])
+            last = None
+            for i in range(len(values) - 1, -1, -1):
+                if values[i] is not _unassigned:
+                    last = (i, values[i])
+                elif last is not None:
+                    upper[i] = last[1] - (last[0] - i)
+
+            for i, variable in enumerate(variables):
+                if values[i] is not _unassigned or (lower[i] is None and upper[i] is None):
+                    continue
+                domain = domains[variable]
+                for value in domain[:]:
+                    if (lower[i] is not None and value < lower[i]) or (upper[i] is not None and value > upper[i]):
+                        domain.hideValue(value)
+                if not domain:
+                    return False
+        return True
+
+
+'''
+The second variable is the first one plus a fixed interval: n2 == n1 + interval.
+'''
+class FixedIntervalConstraint(Constraint):
+    def __init__(self, interval):
+        self.interval = interval
+
+    def __call__(self, variables, domains, assignments, forwardcheck=False):
+        first, second = variables
+        if first in assignments and second in assignments:
+            return assignments[second] == assignments[first] + self.interval
+
+        if forwardcheck:
+            if first in assignments:
+                return _keepOnly(domains[second], assignments[first] + self.interval)
+            if second in assignments:
+                return _keepOnly(domains[first], assignments[second] - self.interval)
+        return True
+
+
+'''
+Two neighbor notes are at most max_spread semitones apart.
+'''
+class MaxSpreadConstraint(Constraint):
+    def __init__(self, max_spread=12):
+        self.max_spread = max_spread
+
+    def __call__(self, variables, domains, assignments, forwardcheck=False):
+        first, second = variables
+        if first in assignments and second in assignments:
+            return abs(assignments[first] - assignments[second]) <= self.max_spread
+
+        if forwardcheck:
+            for assigned, unassigned in [(first, second), (second, first)]:
+                if assigned in assignments:
+                    domain = domains[unassigned]
+                    for value in domain[:]:
+                        if abs(value - assignments[assigned]) > self.max_spread:
+                            domain.hideValue(value)
+                    if not domain:
+                        return False
+        return True
+
+
+'''
+Raised by a SearchMonitor once its deadline has passed, to cut the search off.
+'''
+class SearchDeadlineExceeded(Exception):
+    pass
+
+
+'''
+Not a real constraint: it applies to every variable and always holds, so the solver calls it once per value it
+tries. Added to a problem before any other constraint, it counts the search nodes visited.
+With a deadline (a time.perf_counter() value), it raises SearchDeadlineExceeded at the first node past it.
+'''
+class SearchMonitor(Constraint):
+    def __init__(self, deadline=None):
+        self.nodes = 0
+        self.deadline = deadline
+
+    def __call__(self, variables, domains, assignments, forwardcheck=False):
+        self.nodes += 1
+        if self.deadline is not None and time.perf_counter() > self.deadline:
+            raise SearchDeadlineExceeded()
+        return True
+
+    def preProcess(self, variables, domains, constraints, vconstraints):
+        # never dropped, even for a single variable
+        pass
+
+
+def _keepOnly(domain, kept_value):
+    for value in domain[:]:
+        if value != kept_value:
+            domain.hideValue(value)
+    return bool(domain)
@@ -1,33 +1,67 @@
 from constraint import *
-from music21 import pitch, chord, note
 import random
 
+import atexit
 import json
+import logging
+import os
+import tempfile
+import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+import numpy as np
+
+from modules.utils import *
+from modules.rangeProfiles import *
+from modules.voicingLibrary import VOICING_LIBRARY
+from modules.voicedProgression import VoicedProgression
+from modules.voicingIndex import VoicingIndex, indexKey, writeVoicingIndex
+from modules.voiceLeading import TransitionCache, distanceMatrix, satbTransitionMatrix, viterbiPath
+from modules.voicingSearch import VoicingCost, topVoicings
+from modules.noteConstraints import *
+from modules.solverStats import SolverStats
+
+logger = logging.getLogger(__name__)
 
 # Global constraints: note values shouldn't be too high nor too low
-LOWEST_NOTE = pitch.Pitch("C2").midi
-HIGHEST_NOTE = pitch.Pitch("G5").midi
+# These are the range of the default profile; other instrument ranges are in modules/rangeProfiles.py
+LOWEST_NOTE = DEFAULT_PROFILE.lowest
+HIGHEST_NOTE = DEFAULT_PROFILE.highest
 GLOBAL_DOMAIN = list(range(LOWEST_NOTE, HIGHEST_NOTE + 1))
 
+# Relaxations loosen the constraints of a chord when no solution can be found; see RELAXATION_LADDER.
+#   "widen_range": one more octave below and above the profile's range
+#   "drop_spread": neighbor notes may be more than an octave apart
+#   "drop_smooth": smooth mode no longer has to stay close to the previous chord
+#   "simple": every chord is voiced in simple mode
+# profile is a RangeProfile or the name of one in PROFILES; None is the default C2-G5 range.
+def noteRange(relaxations=(), profile=None):
+    return rangeProfile(profile).noteRange(relaxations)
+
+# chord_formulas contain intervals for possible chord types; they are read from modules/voicingLibrary.json
+CHORD_FORMULAS = VOICING_LIBRARY.chord_formulas
+
+
 # Helper functions
+# Notes are midi values; see modules/utils.py
 def shift(note, semitones):
-    return pitch.Pitch(note.midi + semitones)
-
-def fill_dict_value(note_dict, key, note):
-    note_val = pitch.Pitch(note)
-    while note_val.midi >= LOWEST_NOTE:
-        note_val.midi -= 12
-    note_val.midi += 12
-    while note_val.midi <= HIGHEST_NOTE:
-        note_dict[key].append(note_val.midi)
-        note_val.midi += 12
-
-def prepare_note_dict(root_note, chord_type):
+    return note + semitones
+
+# domains: the precomputed notes of every pitch class, see rangeDomains()
+def fill_dict_value(note_dict, key, note, domains=None):
+    domains = domains or DEFAULT_PROFILE.domains
+    note_dict[key].extend(domains[note % 12])
+
+# note_range, a (lowest, highest) tuple, overrides the range of the profile
+def prepare_note_dict(root_note, chord_type, note_range=None, profile=None):
     # print("processing root_note: " + root_note)
     # print("processing chord_type: " + chord_type)
+    domains = rangeProfile(profile).domains if note_range is None else rangeDomains(*note_range)
     note_dict = dict([("root", []), ("third", []), ("fifth", []), ("seventh", []), ("ninth", []), ("extensions", [])])
     
-    root = pitch.Pitch(root_note)
+    root = noteNameToMidi(root_note)
     
     is_sus4, is_sus2, is_b5, is_sharp5, is_b9, is_sharp9 = False, False, False, False, False, False
     # Remove any suffixes from the chord type, it would be processed later
@@ -55,74 +89,52 @@ def prepare_note_dict(root_note, chord_type):
         chord_type = chord_type.replace('#9', '')
         is_sharp9 = True
         
-    # chord_formulas contain intervals for possible chord types
-    chord_formulas = {
-        'maj': [0, 4, 7],  # Major triad
-        'min': [0, 3, 7],  # Minor triad
-        '7': [0, 4, 7, 10],  # Dominant 7th
-        'maj7': [0, 4, 7, 11],  # Major 7th
-        'min6': [0, 3, 7, 9],  # Minor 6th
-        'min7': [0, 3, 7, 10],  # Minor 7th
-        'dim7': [0, 3, 6, 9],  # Diminished 7th
-        'maj9': [0, 4, 7, 11, 2],  # Major 9th
-        'min9': [0, 3, 7, 10, 2],  # Minor 9th
-        '9': [0, 4, 7, 10, 2],  # Dominant 9th
-        '13': [0, 4, 7, 10, 2, 9],  # Dominant 13th
-        '7#11': [0, 4, 7, 10, 6],  # Dominant 7th sharp 11th
-        '7b13': [0, 4, 7, 10, 9],  # Dominant 7th flat 13th
-        'dim': [0, 3, 6],  # Diminished triad
-        'aug': [0, 4, 8],  # Augmented triad
-        'dim7': [0, 3, 6, 9],  # Diminished 7th
-        'hdim7': [0, 3, 6, 10],  # Half-diminished 7th
-        'minmaj7': [0, 3, 7, 11],  # Minor major 7th
-    }
-    
-    if chord_type not in chord_formulas.keys():
+    if chord_type not in CHORD_FORMULAS.keys():
         error = "Chord type not recognized."
         raise ValueError(error)
     
     # interval_list: list of intervals to be added to the root note
-    interval_list = chord_formulas[chord_type]
+    interval_list = CHORD_FORMULAS[chord_type]
     
     interval_strings = ["root", "third", "fifth", "seventh", "ninth", "extensions"]
     
     for i, interval in enumerate(interval_list):
         interval_string = str(interval_strings[i])  # Ensure this results in a string
         note = shift(root, interval)
-        fill_dict_value(note_dict, interval_string, note)
+        fill_dict_value(note_dict, interval_string, note, domains)
         
     # Alter the notes based on the chord type
     if is_sus4: 
         note_dict["third"].clear()
         third = shift(root, 5)
-        fill_dict_value(note_dict, "third", third)
+        fill_dict_value(note_dict, "third", third, domains)
         
     if is_sus2: 
         note_dict["third"].clear()
         third = shift(root, 2)
-        fill_dict_value(note_dict, "third", third)
+        fill_dict_value(note_dict, "third", third, domains)
         
     if is_b5: 
         note_dict["fifth"].clear()
         fifth = shift(root, 6)
-        fill_dict_value(note_dict, "fifth", fifth)
+        fill_dict_value(note_dict, "fifth", fifth, domains)
     
     if is_sharp5: 
         note_dict["fifth"].clear()
         fifth = shift(root, 8)
-        fill_dict_value(note_dict, "fifth", fifth)
+        fill_dict_value(note_dict, "fifth", fifth, domains)
         
     if is_b9:
         note_dict["ninth"].clear()
         ninth = shift(root, 1)
-        fill_dict_value(note_dict, "ninth", ninth)
+        fill_dict_value(note_dict, "ninth", ninth, domains)
         if len(note_dict["ninth"]) > 1:
             note_dict["ninth"].pop(0)
         
     if is_sharp9:
         note_dict["ninth"].clear()
         ninth = shift(root, 3)
-        fill_dict_value(note_dict, "ninth", ninth)
+        fill_dict_value(note_dict, "ninth", ninth, domains)
         if len(note_dict["ninth"]) > 1:
             note_dict["ninth"].pop(0)
     
@@ -131,51 +143,431 @@ def prepare_note_dict(root_note, chord_type):
 
 # Solver Wrapper
 # mode: "simple", "jazz", "rootless", "drop2", etc, check if implemented. This is where customizations can be made.
-def produceAllNotes(progression=list, mode=str, list_of_voicings=list):
+# stats: optional SolverStats collecting one record per chord; see modules/solverStats.py
+# time_budget: seconds of search allowed per chord; see candidateSolutions
+# statuses: a list, filled in like stats with the status of every chord voiced: "optimal", "budget" or "fallback" as
+# in candidateSolutions, or "reused" for a voicing kept from previous_result.
+# top_k and cost: for "ranked" mode; see rankVoicings
+# profile: instrument range profile, a RangeProfile or a name in PROFILES; see modules/rangeProfiles.py
+# previous_result and edited: incremental re-voicing after an edit. previous_result is the earlier output for a
+# progression of the same length, edited the indices of the chords that changed since. An unedited chord keeps its
+# previous voicing when it still fits after the chord before it (see sectionEntryFits): always in the independent
+# modes, in smooth mode once it keeps within the smooth constraint of the new previous voicing, and in the others once
+# the chord before it is voiced as it was before. An edit thus only propagates until the voicings converge again.
+# The whole-progression modes ("voiceleading", "satb") are solved again in full.
+def produceAllNotes(progression=list, mode=str, list_of_voicings=list, relaxations=(), rng=None, streaming=False, max_candidates=None, stats=None,
+                    time_budget=None, top_k=1, cost=None, profile=None, previous_result=None, edited=None, statuses=None):
     list_of_all_notes = []
     notes_so_far = []
-    mode_possibilities = ["simple", "jazz", "rootless", "smooth", "custom"]
+    mode_possibilities = ["simple", "jazz", "rootless", "smooth", "voiceleading", "ranked", "satb", "auto", "custom"]
     
     if mode not in mode_possibilities:
         error = "mode not recognized in produceAllNotes"
         raise ValueError(error)
     
+    # the whole-progression modes are not cut off by the time budget
+    if mode == "voiceleading" and "simple" not in relaxations:
+        list_of_all_notes = produceVoiceLeading(progression, relaxations, stats, profile)
+        if statuses is not None:
+            statuses.extend(["optimal"] * len(list_of_all_notes))
+        return list_of_all_notes
+    
+    if mode == "satb" and "simple" not in relaxations:
+        list_of_all_notes = produceSATB(progression, relaxations, stats, profile)
+        if statuses is not None:
+            statuses.extend(["optimal"] * len(list_of_all_notes))
+        return list_of_all_notes
+    
     voicing_modes = translateVoicing(list_of_voicings)
-    print(voicing_modes)
+    chord_modes = voicing_modes if mode == "custom" else [mode] * len(progression)
+    rng = rng or random
+    
+    incremental = previous_result is not None
+    if incremental:
+        if len(previous_result) != len(progression):
+            error = "previous_result does not match the length of the progression in produceAllNotes"
+            raise ValueError(error)
+        previous_result = [[int(note) for note in notes] for notes in previous_result]
+        edited = set(edited or ())
+    
+    # chords whose voicing ignores notes_so_far are solved once per distinct chord, before the loop;
+    # every occurrence still picks its own voicing from the shared candidates
+    shared_solutions = {}
+    shared_statuses = {}
+    for iteration, (current_chord, chord_mode) in enumerate(zip(progression, chord_modes)):
+        if incremental and iteration not in edited:
+            continue
+        if isIndependentMode(chord_mode, relaxations, streaming) and (current_chord, chord_mode) not in shared_solutions:
+            record = {} if statuses is not None else None
+            shared_solutions[(current_chord, chord_mode)] = candidateSolutions(current_chord, [], chord_mode, relaxations, rng, stats=stats,
+                                                                               time_budget=time_budget, profile=profile, record=record)
+            shared_statuses[(current_chord, chord_mode)] = record and record["status"]
     
     for iteration in range(0, len(progression)):
-        if mode == "custom":
-            solution = produceNotes(progression[iteration], notes_so_far, voicing_modes[iteration])
+        shared = shared_solutions.get((progression[iteration], chord_modes[iteration]))
+        record = {} if statuses is not None else None
+        if incremental and iteration not in edited and (isIndependentMode(chord_modes[iteration], relaxations, streaming) or iteration == 0
+                                                        or sectionEntryFits(chord_modes[iteration], notes_so_far[-1], previous_result[iteration - 1],
+                                                                            previous_result[iteration], relaxations)):
+            solution = previous_result[iteration]
+            status = "reused"
+        elif shared is not None:
+            solution = pickSolution(shared, rng)
+            status = shared_statuses[(progression[iteration], chord_modes[iteration])]
         else:
-            solution = produceNotes(progression[iteration], notes_so_far, mode)
+            solution = produceNotes(progression[iteration], notes_so_far, chord_modes[iteration], relaxations=relaxations,
+                                    rng=rng, streaming=streaming, max_candidates=max_candidates, stats=stats, time_budget=time_budget,
+                                    top_k=top_k, cost=cost, profile=profile, record=record)
+            status = record and record["status"]
         if solution:
             # print("solution found")
             notes_so_far.append(solution)
             list_of_all_notes.append(solution)
+            if statuses is not None:
+                statuses.append(status)
             
         else:
-            print("solution not found")
             break  # If no solution is found, break the loop
     
         
     # print("notes_so_far: ")
     # print(notes_so_far)
     
+    return list_of_all_notes
+
+
+
+# Whether a chord's voicings in the given mode do not depend on the chords before it.
+# Streaming simple mode is left out, as each call samples its own solution.
+def isIndependentMode(mode, relaxations=(), streaming=False):
+    if "simple" in relaxations:
+        mode = "simple"
+    return mode in CACHED_MODES and not (streaming and mode == "simple")
+
+
+# Indices of the chords that differ between two progressions of the same length, for produceAllNotes' edited
+def editedIndices(previous_progression, progression):
+    return [i for i, (previous_chord, current_chord) in enumerate(zip(previous_progression, progression)) if previous_chord != current_chord]
+
+
+# Solver fallback chain: each step relaxes the constraints a bit more, and gets a bounded number of attempts.
+# Falling back to simple mode starts again from the normal range and spread, and only then relaxes them.
+RELAXATION_LADDER = [
+    ("none", ()),
+    ("widen_range", ("widen_range",)),
+    ("drop_spread", ("widen_range", "drop_spread")),
+    ("drop_smooth", ("widen_range", "drop_spread", "drop_smooth")),
+    ("simple", ("simple",)),
+    ("simple_widen_range", ("simple", "widen_range")),
+    ("simple_drop_spread", ("simple", "widen_range", "drop_spread")),
+]
+
+# Whether a step of the RELAXATION_LADDER can fail one time and succeed the next: smooth mode builds on a randomized
+# previous chord (and auto races it), and streaming samples its solutions. Every other failure is deterministic.
+def isRandomizedStep(mode, list_of_voicings, relaxations=(), streaming=False):
+    if "simple" in relaxations:
+        return streaming
+    chord_modes = translateVoicing(list_of_voicings) if mode == "custom" else [mode]
+    return streaming or "smooth" in chord_modes or "auto" in chord_modes
+
+
+# Runs produceAllNotes down the RELAXATION_LADDER until a step succeeds.
+# A randomized step (see isRandomizedStep) gets up to attempts tries, any other step one; failures are logged.
+# Returns the notes and the name of the relaxation that produced them; raises ValueError once every step is exhausted.
+# previous_result, edited and streaming are passed on to produceAllNotes; with sections, produceAllNotesBySection is
+# run instead.
+def produceAllNotesWithFallback(progression, mode, list_of_voicings, attempts=3, stats=None, profile=None, previous_result=None, edited=None,
+                                sections=None, streaming=False):
+    for relaxation_name, relaxations in RELAXATION_LADDER:
+        if stats is not None:
+            stats.relaxation = relaxation_name
+        step_attempts = attempts if isRandomizedStep(mode, list_of_voicings, relaxations, streaming and sections is None) else 1
+        for attempt in range(step_attempts):
+            if stats is not None:
+                stats.attempt = attempt + 1
+            try:
+                if sections is not None:
+                    return produceAllNotesBySection(progression, mode, list_of_voicings, sections, relaxations, stats=stats,
+                                                    profile=profile), relaxation_name
+                return produceAllNotes(progression, mode, list_of_voicings, relaxations, streaming=streaming, stats=stats, profile=profile,
+                                       previous_result=previous_result, edited=edited), relaxation_name
+            except ValueError as e:
+                if stats is not None:
+                    stats.retries += 1
+                logger.warning("No solution: %s. Relaxation %s, attempt %d of %d.", e, relaxation_name, attempt + 1, step_attempts)
+    
+    error = "No solution found for produceAllNotes, even with every constraint relaxed."
+    raise ValueError(error)
+
+
+# Batch voicing
+# Progressions are fanned out over a process pool in chunks and come back in order. Every worker starts with a copy
+# of this process's in-memory solution cache, and attaches the same disk cache (read only) and (memory-mapped)
+# voicing index. Workers never write the disk cache: the entries they solve come back with their results, and this
+# process merges and flushes them once the batch is done.
+# Results are VoicedProgression objects (see modules/voicedProgression.py), which are also cheaper to send back.
+def produceAllNotesBatch(progressions, mode, voicings=None, workers=None, chunksize=16, fallback=False):
+    if voicings is None:
+        voicings = [["1" for _ in progression] for progression in progressions]
+    jobs = [(progression, mode, list_of_voicings, fallback) for progression, list_of_voicings in zip(progressions, voicings)]
+    
+    if workers == 1:
+        results = [voiceBatchJob(job)[0] for job in jobs]
+        SOLUTION_CACHE.flush()
+        return results
+    
+    initargs = (dict(SOLUTION_CACHE.entries), SOLUTION_CACHE.path, VOICING_INDEX.path if VOICING_INDEX else None)
+    results = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=initBatchWorker, initargs=initargs) as executor:
+        for voiced, new_entries in executor.map(voiceBatchJob, jobs, chunksize=chunksize):
+            SOLUTION_CACHE.merge(new_entries)
+            results.append(voiced)
+    SOLUTION_CACHE.flush()
+    return results
+
+
+def initBatchWorker(cache_entries, cache_path, index_path):
+    if cache_path:
+        SOLUTION_CACHE.attach(cache_path, read_only=True)
+    if index_path:
+        useVoicingIndex(index_path)
+    for key, solutions in cache_entries.items():
+        SOLUTION_CACHE.remember(key, solutions)
+
+
+# Returns the voiced progression, and the disk cache entries solved for it (in a worker; none otherwise)
+def voiceBatchJob(job):
+    progression, mode, list_of_voicings, fallback = job
+    if fallback:
+        notes = produceAllNotesWithFallback(progression, mode, list_of_voicings)[0]
+    else:
+        notes = produceAllNotes(progression, mode, list_of_voicings)
+    return VoicedProgression.fromLists(notes), SOLUTION_CACHE.takeNew()
+
+
+# All-keys rendering
+# The progression is transposed to the 12 keys at once: key k moves every root up k semitones, spelled like INDEX_ROOTS.
+# Simple mode voicings are only transpositions of each chord quality's voicings in C (see canonicalSolutions), so
+# every quality is solved once and moved to all 12 roots in one broadcast, straight into the solution cache; the
+# voicing of every key then only picks among cached candidates. Other modes depend on the chords before, and are
+# voiced key by key.
+# Returns 12 progressions of chord symbols, key 0 being the progression itself (respelled).
+def transposeProgression(progression):
+    roots = np.array([pitchClass(chord.split(':')[0]) for chord in progression], dtype=np.int64)
+    chord_types = [chord.split(':')[1] for chord in progression]
+    key_roots = np.array(INDEX_ROOTS)[(roots[None, :] + np.arange(12)[:, None]) % 12]
+    return [[f"{root}:{chord_type}" for root, chord_type in zip(roots_of_key, chord_types)] for roots_of_key in key_roots]
+
+
+# Fills the solution cache with the simple mode candidates of every chord of the 12 keys, one solve per chord quality
+def shareKeySolutions(progression, relaxations=(), stats=None, profile=None):
+    for chord_type in dict.fromkeys(chord.split(':')[1] for chord in progression):
+        if chord_type not in CHORD_FORMULAS:
+            continue
+        record = {"chord": f"C:{chord_type}", "mode": "simple", "source": "transposed"} if stats is not None else None
+        start = time.perf_counter()
+        canonical = canonicalSolutions(chord_type, relaxations, record, profile=profile)
+        if record is not None and record.get("status") == "budget":
+            continue
+        for pitch_class, solutions in enumerate(transposeAllKeys(canonical, relaxations, profile)):
+            SOLUTION_CACHE.remember(SOLUTION_CACHE.key(f"{INDEX_ROOTS[pitch_class]}:{chord_type}", "simple", relaxations, profile), solutions)
+        if record is not None:
+            record["seconds"] = time.perf_counter() - start
+            stats.add(record)
+
+
+# Voices the progression in all 12 keys.
+# fallback runs every key down the RELAXATION_LADDER, as produceAllNotesWithFallback does; rng is only used without it.
+# Returns the 12 transposed progressions and, for every key, its notes and the relaxation they were found with.
+def produceAllKeys(progression, mode, list_of_voicings, rng=None, stats=None, profile=None, fallback=True):
+    key_progressions = transposeProgression(progression)
+    if mode in ["simple", "custom"]:
+        shareKeySolutions(progression, stats=stats, profile=profile)
+    
+    results = []
+    for key_progression in key_progressions:
+        if fallback:
+            results.append(produceAllNotesWithFallback(key_progression, mode, list_of_voicings, stats=stats, profile=profile))
+        else:
+            results.append((produceAllNotes(key_progression, mode, list_of_voicings, rng=rng, stats=stats, profile=profile), "none"))
+    return key_progressions, results
+
+
+# Section-aware voicing
+# Charts repeat whole sections (AABA, verse / chorus): each distinct section is voiced once, and its voicings are
+# spliced back in wherever it repeats, so the work follows the unique material rather than the length of the song.
+# sections are (label, start, stop) spans of chord indices that follow each other through the progression; see
+# modules/sections.py. Sections with the same chords, in the same modes, share their voicings whatever their label.
+# A repeat is entered from whatever chord comes before it. In the modes that depend on the previous chord, its
+# voicings are kept from the first chord that still fits after the actual previous one (see sectionEntryFits); the
+# chords before that are voiced again, which usually stops at the first chord of the section.
+# The whole-progression modes ("voiceleading", "satb") are not split, and go to produceAllNotes.
+def produceAllNotesBySection(progression, mode, list_of_voicings, sections, relaxations=(), rng=None, stats=None, profile=None):
+    if mode in ["voiceleading", "satb"] and "simple" not in relaxations:
+        return produceAllNotes(progression, mode, list_of_voicings, relaxations, rng=rng, stats=stats, profile=profile)
+    
+    if [start for _, start, _ in sections] != [0] + [stop for _, _, stop in sections[:-1]] or (sections and sections[-1][2] != len(progression)):
+        error = "sections do not cover the progression in produceAllNotesBySection"
+        raise ValueError(error)
+    
+    voicing_modes = translateVoicing(list_of_voicings)
+    chord_modes = voicing_modes if mode == "custom" else [mode] * len(progression)
+    rng = rng or random
+    
+    list_of_all_notes = []
+    # section content: the voicing before its first occurrence, and its voicings
+    voiced_sections = {}
+    for label, start, stop in sections:
+        content = tuple(zip(progression[start:stop], chord_modes[start:stop]))
+        cached = voiced_sections.get(content)
+        for i, (current_chord, chord_mode) in enumerate(content):
+            previous = list_of_all_notes[-1] if list_of_all_notes else None
+            if cached is not None:
+                cached_previous = cached[1][i - 1] if i > 0 else cached[0]
+                if sectionEntryFits(chord_mode, previous, cached_previous, cached[1][i], relaxations):
+                    list_of_all_notes.extend(cached[1][i:])
+                    break
+            list_of_all_notes.append(produceNotes(current_chord, list_of_all_notes[-1:], chord_mode, relaxations=relaxations, rng=rng,
+                                                  stats=stats, profile=profile))
+        if cached is None:
+            voiced_sections[content] = (list_of_all_notes[start - 1] if start > 0 else None, list_of_all_notes[start:stop])
     
     return list_of_all_notes
 
 
+# Whether a cached voicing, found after cached_previous, can follow previous (None at the start of the progression).
+# The independent modes do not look at the previous chord, and neither does smooth mode under "drop_smooth" once
+# there is one; smooth mode otherwise needs every note within 5 semitones of a previous note, the constraint of
+# buildProblem (which also covers its bass rule), or, with no previous chord, notes in ascending order. In the other
+# modes, the previous voicing must be the one the cached voicing was found after.
+def sectionEntryFits(mode, previous, cached_previous, notes, relaxations=()):
+    if isIndependentMode(mode, relaxations):
+        return True
+    if mode == "smooth":
+        if previous is None:
+            return all(n1 < n2 for n1, n2 in zip(notes, notes[1:]))
+        if "drop_smooth" in relaxations:
+            return True
+        distances = np.abs(np.asarray(notes)[:, None] - np.asarray(previous)[None, :])
+        return bool((distances.min(axis=1) <= 5).all())
+    return previous == cached_previous
 
-# CSP Solver function
-def produceNotes(current_chord, notes_so_far=list, mode="simple", list_of_voicings=list):
 
+# Voicing structures for the "jazz" and "rootless" modes, as intervals above the root
+# They are compiled from modules/voicingLibrary.json; these dictionaries are views of it, built once
+JAZZ_VOICINGS = VOICING_LIBRARY.asDict("jazz")
+ROOTLESS_VOICINGS = VOICING_LIBRARY.asDict("rootless")
+
+
+# Voicing families reachable through voicingFamilyName, in matching order
+VOICING_FAMILIES = VOICING_LIBRARY.families
+
+
+# Returns the name of the voicing family ("maj", "min", "dim" or "7") that fits the chord type
+def voicingFamilyName(current_chord_type):
+    return VOICING_LIBRARY.family(current_chord_type)
+
+
+# Returns the list of voicing structures in the given voicing library that fit the chord type
+def chooseVoicingFamily(voicings, current_chord_type):
+    return voicings[voicingFamilyName(current_chord_type)]
+
+
+# Bass note of the "jazz" and "rootless" voicings; since current_chord_root is the root, noteNameToMidi(current_chord_root) is the midi value
+# Profiles that start higher than that move the bass up by octaves until it is in range.
+def structureRootMidi(current_chord_root, mode, profile=None):
+    root_midi = noteNameToMidi(current_chord_root) - 12
+    if mode == "jazz" and root_midi >= 55:
+        root_midi -= 12     # ensure the bass is low enough
+    elif mode == "rootless" and root_midi >= 53:
+        root_midi -= 12     # ensure the bass is low enough to fit the whole chord in
+    while root_midi < rangeProfile(profile).lowest:
+        root_midi += 12
+    return root_midi
+
+
+# Closed-form solver for the "jazz" and "rootless" modes.
+# Every note is fixed by root_midi + chord_structure[i], so instead of searching GLOBAL_DOMAIN the voicing is
+# built directly and checked against the same constraints buildProblem() would add. Returns None if it breaks one.
+def structureVoicing(current_chord, mode, chord_structure, relaxations=(), profile=None):
+    root_midi = structureRootMidi(current_chord.split(':')[0], mode, profile)
+    notes = [root_midi + interval for interval in chord_structure]
+    
+    # domain of every variable
+    lowest_note, highest_note = noteRange(relaxations, profile)
+    if notes[0] < lowest_note or max(notes) > highest_note:
+        return None
+    
+    # rootless voicings are ordered from small to big
+    if mode == "rootless" and any(n1 >= n2 for n1, n2 in zip(notes, notes[1:])):
+        return None
+    
+    # MinSumConstraint
+    if sum(notes) < len(notes) * 50:
+        return None
+    
+    # neighbor notes are not too far apart
+    if "drop_spread" not in relaxations and any(abs(n1 - n2) > 12 for n1, n2 in zip(notes, notes[1:])):
+        return None
+    
+    return notes
+
+
+# structureVoicing() for every structure of a voicing family at once, over the compiled rows of the voicing library
+# Rows are padded with -1, so padded cells are masked out of every check. Returns the valid voicings, in library order.
+def structureVoicings(current_chord, mode, family, relaxations=(), profile=None):
+    rows, widths = VOICING_LIBRARY.familyArrays(mode, family)
+    root_midi = structureRootMidi(current_chord.split(':')[0], mode, profile)
+    notes = rows.astype(np.int32) + root_midi
+    filled = np.arange(rows.shape[1])[None, :] < widths[:, None]
+    neighbors = filled[:, 1:]
+    steps = notes[:, 1:] - notes[:, :-1]
+    
+    # domain of every variable
+    lowest_note, highest_note = noteRange(relaxations, profile)
+    valid = (notes[:, 0] >= lowest_note) & (np.where(filled, notes, lowest_note).max(axis=1) <= highest_note)
+    
+    # rootless voicings are ordered from small to big
+    if mode == "rootless":
+        valid &= ~(neighbors & (steps <= 0)).any(axis=1)
+    
+    # MinSumConstraint
+    valid &= np.where(filled, notes, 0).sum(axis=1) >= widths * 50
+    
+    # neighbor notes are not too far apart
+    if "drop_spread" not in relaxations:
+        valid &= ~(neighbors & (np.abs(steps) > 12)).any(axis=1)
+    
+    return [row[:width].tolist() for row, width, keep in zip(notes, widths, valid) if keep]
+
+
+# Keeps the notes of a domain that lie within max_distance semitones of some previous chord note, in one NumPy broadcast
+def nearPreviousNotes(domain, previous_notes, max_distance):
+    domain = np.asarray(domain)
+    distances = np.abs(domain[:, None] - np.asarray(previous_notes)[None, :])
+    return domain[(distances <= max_distance).any(axis=1)].tolist()
+
+
+# Builds the CSP for a single chord; returns the problem and its note variables.
+# chord_structure picks the voicing in "jazz" and "rootless" mode; a random one is used if not given.
+# rng is anything with the random module's interface, e.g. a seeded random.Random.
+# monitor, a SearchMonitor, is added ahead of every other constraint to count the search nodes.
+# note_range overrides the (lowest, highest) range of the profile, and min_sum=False leaves out the MinSumConstraint.
+def buildProblem(current_chord, notes_so_far=None, mode="simple", chord_structure=None, relaxations=(), rng=random, monitor=None,
+                 note_range=None, min_sum=True, profile=None):
+
+    notes_so_far = notes_so_far or []
     problem = Problem()
+    if monitor is not None:
+        problem.addConstraint(monitor)
+    note_range = note_range or noteRange(relaxations, profile)
+    domain = list(range(note_range[0], note_range[1] + 1))
     
     # Simple mode: most basic voicing, with a doubled bass down an octave
     if mode == "simple":   
         # print("current_chord: " + current_chord)
         
-        note_dict = prepare_note_dict(current_chord.split(':')[0], current_chord.split(':')[1])
+        note_dict = prepare_note_dict(current_chord.split(':')[0], current_chord.split(':')[1], note_range)
         # print("note_dict: ")
         # print(note_dict)
         
@@ -192,183 +584,106 @@ def produceNotes(current_chord, notes_so_far=list, mode="simple", list_of_voicin
             problem.addVariable(note_vars[i], note_dict[non_empty_keys[i]])
         
         # Add constraints to ensure notes are ordered from small to big
-        for k in range(len(note_vars) - 1):
-            problem.addConstraint(lambda n1, n2: n1 < n2, (note_vars[k], note_vars[k+1]))
+        problem.addConstraint(OrderedChainConstraint(), note_vars)
         
-        problem.addVariable("bass_note", GLOBAL_DOMAIN)
-        problem.addConstraint(lambda n1, n2: n1 == n2 + 12, (note_vars[0], "bass_note"))  
+        problem.addVariable("bass_note", domain)
+        problem.addConstraint(FixedIntervalConstraint(12), ("bass_note", note_vars[0]))
     
         
     elif mode == "jazz":
         # Craft a custom voicing for each chord
-        # alan fort, 20th century, check 12 tone music
-        jazz_voicings = {
-            "maj": [[0, 11, 14, 16, 19], # open studio jazz
-                    [0, 9, 11, 16, 19], 
-                    [0, 7, 14, 19, 23], 
-                    [0, 7, 9, 14, 16]],
-            "min": [[0, 10, 15, 21, 26],
-                    [0, 7, 10, 14, 17],
-                    [0, 3, 10, 14, 19],
-                    [0, 10, 14, 15, 21]], 
-            "7": [[0, 10, 16, 21, 25],
-                  [0, 10, 16, 20, 24],
-                  [0, 10, 14, 16, 19],
-                  [0, 10, 16, 21, 25]],
-            "9": [[0, 10, 16, 20, 25],
-                  [0, 10, 16, 20, 24],
-                  [0, 10, 14, 16, 19],
-                  [0, 10, 16, 21, 25]],
-            "dim": [[0, 6, 9, 17],  # Peter Martin
-                    [0, 6, 9, 15, 20],
-                    [0, 3, 6, 9, 12],
-                    [0, 6, 9, 15, 18]],
-        }
-        
         # print("current_chord: " + current_chord)
         
         current_chord_root = current_chord.split(':')[0]
         current_chord_type = current_chord.split(':')[1]
         
-        if "maj" in current_chord_type:
-            # randomly choose a voicing from maj voicings
-            chord_structure = jazz_voicings["maj"][random.randint(0, len(jazz_voicings["maj"]) - 1)]
-            
-        elif "min" in current_chord_type:
-            chord_structure = jazz_voicings["min"][random.randint(0, len(jazz_voicings["min"]) - 1)]
-            
-        elif "dim" in current_chord_type:
-            chord_structure = jazz_voicings["dim"][random.randint(0, len(jazz_voicings["dim"]) - 1)] 
-        
-        elif "7" in current_chord_type:
-            chord_structure = jazz_voicings["7"][random.randint(0, len(jazz_voicings["7"]) - 1)]
-        
-        else:
-            error = "Ooh I have not thought that far in"
-            raise ValueError(error)   
+        if chord_structure is None:
+            # randomly choose a voicing from the matching voicings
+            chord_structure = rng.choice(chooseVoicingFamily(JAZZ_VOICINGS, current_chord_type))
         
         note_vars = [f"{current_chord}_note_{i}" for i in range(len(chord_structure))]
         
         # Initialize variables
-        problem.addVariables(note_vars, GLOBAL_DOMAIN)
+        problem.addVariables(note_vars, domain)
         
-        # First one is always root; since current_chord_root is the root, pitch.Pitch(current_chord_root).midi is the midi value
-        root_midi = pitch.Pitch(current_chord_root).midi - 12
-        if root_midi >= 55:
-            root_midi -= 12     # ensure the bass is low enough
-        problem.addConstraint(lambda n1: n1 == root_midi, (note_vars[0],))
+        # First one is always root
+        root_midi = structureRootMidi(current_chord_root, mode, profile)
+        problem.addConstraint(InSetConstraint([root_midi]), (note_vars[0],))
         
         # Ensure that each note is placed accordingly to the difference within chord_structure
         for i in range(1, len(note_vars)):
-            problem.addConstraint(lambda n1, n2, interval=chord_structure[i]: n2 == n1 + interval, (note_vars[0], note_vars[i]))
+            problem.addConstraint(FixedIntervalConstraint(chord_structure[i]), (note_vars[0], note_vars[i]))
     
     
     elif mode == "rootless":
         
-        rootless_voicings = {
-            "maj": [[0, 9, 14, 19], # open studio jazz, PianoPig
-                    [0, 7, 11, 14, 16]], 
-            "min": [[0, 10, 14, 15, 19],
-                    [0, 3, 5, 10, 14]], 
-            "7": [[0, 4, 9, 10, 14],
-                  [0, 10, 14, 16]],
-            "9": [[0, 4, 9, 10, 14],
-                  [0, 10, 14, 16]],
-            "dim": [[0, 6, 9, 17],  # Peter Martin
-                    [0, 6, 9, 15, 20],
-                    [0, 3, 6, 9, 12],
-                    [0, 6, 9, 15, 18]],
-            "dim7": [[0, 6, 9, 17],  
-                    [0, 6, 9, 15, 20],
-                    [0, 3, 6, 9, 12],
-                    [0, 6, 9, 15, 18]]
-        }
-
-        print("current_chord: " + current_chord)
+        # print("current_chord: " + current_chord)
         
         current_chord_root = current_chord.split(':')[0]
         current_chord_type = current_chord.split(':')[1]
         
-        if "maj" in current_chord_type:
-            # randomly choose a voicing from maj voicings
-            chord_structure = rootless_voicings["maj"][random.randint(0, len(rootless_voicings["maj"]) - 1)]
-            
-        elif "min" in current_chord_type:
-            chord_structure = rootless_voicings["min"][random.randint(0, len(rootless_voicings["min"]) - 1)]
-            
-        elif "dim" in current_chord_type:
-            chord_structure = rootless_voicings["dim"][random.randint(0, len(rootless_voicings["dim"]) - 1)] 
-        
-        elif "7" in current_chord_type:
-            chord_structure = rootless_voicings["7"][random.randint(0, len(rootless_voicings["7"]) - 1)]
+        if chord_structure is None:
+            chord_structure = rng.choice(chooseVoicingFamily(ROOTLESS_VOICINGS, current_chord_type))
         
-        else:
-            error = "Ooh I have not thought that far in"
-            raise ValueError(error)   
-        
-        print("chord_structure: ")
-        print(chord_structure)
         note_vars = [f"{current_chord}_note_{i}" for i in range(len(chord_structure))]
         
         # Initialize variables
-        problem.addVariables(note_vars, GLOBAL_DOMAIN)
+        problem.addVariables(note_vars, domain)
         
-        # First one is always root; since current_chord_root is the root, pitch.Pitch(current_chord_root).midi is the midi value
-        root_midi = pitch.Pitch(current_chord_root).midi - 12
-        if root_midi >= 53:
-            root_midi -= 12     # ensure the bass is low enough to fit the whole chord in
-        problem.addConstraint(lambda n1: n1 == root_midi, (note_vars[0],))
+        # First one is always root
+        root_midi = structureRootMidi(current_chord_root, mode, profile)
+        problem.addConstraint(InSetConstraint([root_midi]), (note_vars[0],))
         
         # Add constraints to ensure notes are ordered from small to big
-        for k in range(len(note_vars) - 1):
-            problem.addConstraint(lambda n1, n2: n1 < n2, (note_vars[k], note_vars[k+1]))
+        problem.addConstraint(OrderedChainConstraint(), note_vars)
         
         
         # Ensure that each note is placed accordingly to the difference within chord_structure
         for i in range(1, len(note_vars)):
-            problem.addConstraint(lambda n1, n2, interval=chord_structure[i]: n2 == n1 + interval, (note_vars[0], note_vars[i]))
+            problem.addConstraint(FixedIntervalConstraint(chord_structure[i]), (note_vars[0], note_vars[i]))
                         
     elif mode == "smooth":
         
         # print("current_chord: " )
         # print(current_chord)
         
-        note_dict = prepare_note_dict(current_chord.split(':')[0], current_chord.split(':')[1])
+        note_dict = prepare_note_dict(current_chord.split(':')[0], current_chord.split(':')[1], note_range)
         
         # Filter out empty lists and get the non-empty keys
         non_empty_keys = [key for key, value in note_dict.items() if value]
         
         # Create variables based on the number of non-empty keys
         note_vars = [f"{current_chord}_note_{i}" for i in range(len(non_empty_keys))]
-        
-        # Add variables to the problem with the given domain; that is, possible note values corresponding to its possible value
-        for i in range(len(note_vars)):
-            problem.addVariable(note_vars[i], note_dict[non_empty_keys[i]])
+        domains = [note_dict[key] for key in non_empty_keys]
             
-        # Add constraints so that the difference in the value from the previous chord notes to the current one is least possible
-        if notes_so_far != []:
+        # Keep the notes close to the previous chord, so that the difference in the value from the previous chord notes
+        # to the current one is least possible; the domains are filtered up front, so the search only sees feasible values
+        if notes_so_far and "drop_smooth" not in relaxations:
             previous_chord_notes = notes_so_far[-1]
             # shuffle the list content
-            randomized_previous_chord_notes = random.sample(previous_chord_notes, len(previous_chord_notes))
+            randomized_previous_chord_notes = rng.sample(previous_chord_notes, len(previous_chord_notes))
         
             # print("previous_chord_notes: ")
             # print(previous_chord_notes)
             # print("randomized_previous_chord_notes: ")
             # print(randomized_previous_chord_notes)
             
-            for i in range(len(note_vars)):
-                def within_seven(n, prev_notes=randomized_previous_chord_notes):
-                    return any(abs(n - prev_note) <= 5 for prev_note in prev_notes)
-
-                problem.addConstraint(within_seven, (note_vars[i],))
+            domains = [nearPreviousNotes(domain, randomized_previous_chord_notes, 5) for domain in domains]
             
-            # constraint: for variables in current session, there exists at least one note that is abs(n1 - prev_bass) <= 10
-            problem.addConstraint(lambda n1, prev_bass=randomized_previous_chord_notes[0]: abs(n1 - prev_bass) <= 10, (note_vars[0],))
+            # for variables in current session, there exists at least one note that is abs(n1 - prev_bass) <= 10
+            domains[0] = nearPreviousNotes(domains[0], [randomized_previous_chord_notes[0]], 10)
+            
+            if not all(domains):
+                error = "No solution found for produceNotes."
+                raise ValueError(error)
         
-        else:
+        # Add variables to the problem with the given domain; that is, possible note values corresponding to its possible value
+        for i in range(len(note_vars)):
+            problem.addVariable(note_vars[i], domains[i])
+        
+        if not notes_so_far:
             # Add constraints to ensure notes are ordered from small to big
-            for k in range(len(note_vars) - 1):
-                problem.addConstraint(lambda n1, n2: n1 < n2, (note_vars[k], note_vars[k+1]))
+            problem.addConstraint(OrderedChainConstraint(), note_vars)
         
         
     else:
@@ -377,35 +692,699 @@ def produceNotes(current_chord, notes_so_far=list, mode="simple", list_of_voicin
         raise ValueError(error)
         
     # ensuring range
-    problem.addConstraint(MinSumConstraint(len(note_vars) * 50))
+    if min_sum:
+        problem.addConstraint(MinSumConstraint(len(note_vars) * 50))
     
     
     # ensuring that the voicing is not too stray; make sure the distance between the neighbor notes are not too far
-    for i in range(len(note_vars) - 1):
-        problem.addConstraint(lambda n1, n2: abs(n1 - n2) <= 12, (note_vars[i], note_vars[i+1]))
-    
-    # solutions is a list of dictionary objects, each representing a possible solution
-    solutions = problem.getSolutions()
-    
+    if "drop_spread" not in relaxations:
+        for i in range(len(note_vars) - 1):
+            problem.addConstraint(MaxSpreadConstraint(12), (note_vars[i], note_vars[i+1]))
     
-    
-    if solutions:
-        # format solution from list of dict to list of ints
-        formatted_solutions = []
-        for item in solutions:
-            # print(item)
-            added_chord = list(item.values())
-            added_chord = [int(note) for note in added_chord]
-            formatted_solutions.append(added_chord)
-        
-        # now, formatted_solutions is a list of lists
+    return problem, note_vars
+
+
+# format solutions from list of dict to list of ints, lowest note first
+def formatSolutions(solutions, mode):
+    formatted_solutions = []
+    for item in solutions:
+        # print(item)
+        added_chord = sorted(int(note) for note in item.values())
         
         # remove root if it is rootless mode
         if mode == "rootless":
-            for i in range(len(formatted_solutions)):
-                formatted_solutions[i].pop(0)
+            added_chord.pop(0)
         
-        formatted_solution = random.choice(formatted_solutions)
+        formatted_solutions.append(added_chord)
+    
+    # now, formatted_solutions is a list of lists
+    return formatted_solutions
+
+
+# Reservoir sampling over python-constraint's solution iterator: keeps one uniformly chosen solution,
+# so memory stays O(1) however many solutions there are. Stops early after max_candidates solutions if given.
+# Returns the chosen solution (None if the problem has no solution), the number of solutions visited, and False if
+# the deadline of the problem's SearchMonitor cut the search off.
+def sampleSolution(problem, mode, rng=random, max_candidates=None):
+    chosen = None
+    count = 0
+    complete = True
+    try:
+        for count, solution in enumerate(problem.getSolutionIter(), start=1):
+            if rng.randrange(count) == 0:
+                chosen = solution
+            if max_candidates is not None and count >= max_candidates:
+                break
+    except SearchDeadlineExceeded:
+        complete = False
+    
+    if chosen is None:
+        return None, count, complete
+    return formatSolutions([chosen], mode)[0], count, complete
+
+
+# Every solution of a problem, or only those found before its SearchMonitor's deadline.
+# Returns the solutions and False if the search was cut off.
+def collectSolutions(problem):
+    solutions = []
+    try:
+        for solution in problem.getSolutionIter():
+            solutions.append(solution)
+    except SearchDeadlineExceeded:
+        return solutions, False
+    return solutions, True
+
+
+# Deterministic voicing used when the time budget runs out before any solution is found: the chord tones stacked
+# in close position from the root in octave 3, with the doubled bass in simple mode and without the root in rootless mode.
+# The stack then moves by octaves into the profile's range: up until its lowest note is in, or down while its highest
+# note is out and there is room below.
+def fallbackVoicing(current_chord, mode="simple", profile=None):
+    current_chord_root, current_chord_type = current_chord.split(':')
+    note_dict = prepare_note_dict(current_chord_root, current_chord_type, (0, 127))
+    notes = [noteNameToMidi(current_chord_root, 3)]
+    for key in list(note_dict)[1:]:
+        if note_dict[key]:
+            notes.append(min(note for note in note_dict[key] if note > notes[-1]))
+    
+    if mode == "simple":
+        notes.insert(0, notes[0] - 12)
+    elif mode == "rootless":
+        notes.pop(0)
+    
+    lowest_note, highest_note = rangeProfile(profile).noteRange()
+    while notes[0] < lowest_note:
+        notes = [note + 12 for note in notes]
+    while notes[-1] > highest_note and notes[0] - 12 >= lowest_note:
+        notes = [note - 12 for note in notes]
+    return notes
+
+
+# Fills the CSP part of a stats record: number of note variables and their domain sizes before search
+def describeProblem(record, problem, note_vars):
+    record["variables"] = len(note_vars)
+    record["domain_sizes"] = [len(problem._variables[variable]) for variable in note_vars]
+
+
+# Solution cache
+# In "simple", "jazz" and "rootless" mode the solutions only depend on the chord symbol, the mode and the note range,
+# so they are enumerated once and kept in an in-memory LRU, optionally backed by a JSON file that survives restarts.
+CACHED_MODES = ["simple", "jazz", "rootless"]
+
+# Thread safe, as the "auto" mode solves in several threads at once.
+# New entries are written to the disk cache by flush(), not one by one: put() only marks the store dirty, and
+# attach() registers flush() to run at exit. With read_only, as in the batch workers, nothing is ever written; the
+# new entries are collected instead, for takeNew().
+class SolutionCache:
+    def __init__(self, maxsize=1024, path=None):
+        self.maxsize = maxsize
+        self.path = None
+        self.entries = OrderedDict()
+        self.stored = {}
+        self.dirty = False
+        self.read_only = False
+        self.new_keys = set()
+        self.flush_registered = False
+        self.lock = threading.RLock()
+        if path:
+            self.attach(path)
+
+    # Use a JSON file as the persistent layer; entries already in the file are loaded lazily on lookup
+    def attach(self, path, read_only=False):
+        with self.lock:
+            self.path = path
+            self.read_only = read_only
+            self.dirty = False
+            self.new_keys = set()
+            self.stored = self.load(path)
+            if not read_only and not self.flush_registered:
+                atexit.register(self.flush)
+                self.flush_registered = True
+
+    # Entries stored with another voicing library (see key) are left out
+    @staticmethod
+    def load(path):
+        if os.path.exists(path):
+            with open(path, 'r') as file:
+                stored = json.load(file)
+            library = f"|{VOICING_LIBRARY.digest}"
+            return {key: solutions for key, solutions in stored.items() if key.endswith(library)}
+        return {}
+
+    # Keys end with the digest of the voicing library, so that solutions stored before an edit to it are not served
+    def key(self, current_chord, mode, relaxations=(), profile=None):
+        lowest_note, highest_note = noteRange(relaxations, profile)
+        spread = "|nospread" if "drop_spread" in relaxations else ""
+        return f"{current_chord}|{mode}|{lowest_note}-{highest_note}{spread}|{VOICING_LIBRARY.digest}"
+
+    def get(self, key):
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                return self.entries[key]
+            if key in self.stored:
+                solutions = [tuple(solution) for solution in self.stored[key]]
+                self.remember(key, solutions)
+                return solutions
+            return None
+
+    def put(self, key, solutions):
+        with self.lock:
+            self.remember(key, solutions)
+            if self.path:
+                self.stored[key] = [[int(note) for note in solution] for solution in solutions]
+                if self.read_only:
+                    self.new_keys.add(key)
+                else:
+                    self.dirty = True
+
+    def remember(self, key, solutions):
+        with self.lock:
+            self.entries[key] = solutions
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    # The stored entries put since the last call, in the form they are stored in
+    def takeNew(self):
+        with self.lock:
+            entries = {key: self.stored[key] for key in self.new_keys}
+            self.new_keys.clear()
+            return entries
+
+    # Adds stored entries found elsewhere (see takeNew) to the disk cache
+    def merge(self, stored_entries):
+        with self.lock:
+            for key, solutions in stored_entries.items():
+                if key not in self.stored:
+                    self.stored[key] = solutions
+                    self.dirty = True
+
+    def flush(self):
+        with self.lock:
+            if not self.path or self.read_only or not self.dirty:
+                return
+            # keep what other runs stored since this one attached
+            for key, solutions in self.load(self.path).items():
+                self.stored.setdefault(key, solutions)
+            # write to a temporary file of our own first, so that a crash never leaves a truncated store behind
+            directory = os.path.dirname(os.path.abspath(self.path))
+            handle, temp_path = tempfile.mkstemp(dir=directory, prefix=os.path.basename(self.path) + ".", suffix=".tmp")
+            try:
+                with os.fdopen(handle, 'w') as file:
+                    json.dump(self.stored, file)
+                os.replace(temp_path, self.path)
+            except BaseException:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+                raise
+            self.dirty = False
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+SOLUTION_CACHE = SolutionCache()
+
+
+def useDiskCache(path):
+    SOLUTION_CACHE.attach(path)
+
+
+# Enumerates (or fetches from the cache or the voicing index) every voicing of a chord in one of the CACHED_MODES.
+# In "jazz" and "rootless" mode the solutions of all matching voicing structures are pooled.
+# record, if given, is a stats record that gets the source of the solutions and the CSP details.
+def enumerateSolutions(current_chord, mode, relaxations=(), record=None, deadline=None, profile=None):
+    key = SOLUTION_CACHE.key(current_chord, mode, relaxations, profile)
+    solutions = SOLUTION_CACHE.get(key)
+    if solutions is not None:
+        if record is not None:
+            record["source"] = "cache"
+        return solutions
+    
+    solutions = lookupVoicingIndex(current_chord, mode, relaxations, profile)
+    if solutions is not None:
+        if record is not None:
+            record["source"] = "index"
+        SOLUTION_CACHE.remember(key, solutions)
+        return solutions
+    
+    solutions = []
+    if mode == "simple":
+        # transposed from the chord quality's solutions in C; only kept in memory, the C solutions are what gets stored
+        if record is not None:
+            record["source"] = "transposed"
+        chord_type = current_chord.split(':')[1]
+        solutions = transposeSolutions(canonicalSolutions(chord_type, relaxations, record, deadline, profile),
+                                       pitchClass(current_chord.split(':')[0]), relaxations, profile)
+        # solutions cut off by the deadline are incomplete, and never cached
+        if record is None or record.get("status") != "budget":
+            SOLUTION_CACHE.remember(key, solutions)
+        return solutions
+    else:
+        if record is not None:
+            record["source"] = "closed_form"
+        family = voicingFamilyName(current_chord.split(':')[1])
+        for notes in structureVoicings(current_chord, mode, family, relaxations, profile):
+            # format like formatSolutions(): lowest note first, without the root in rootless mode
+            solution = tuple(sorted(notes)[1:] if mode == "rootless" else sorted(notes))
+            if solution not in solutions:
+                solutions.append(solution)
+    
+    SOLUTION_CACHE.put(key, solutions)
+    return solutions
+
+
+# Transposition-invariant solving for simple mode
+# A Dmin7 voicing is a Cmin7 voicing shifted by two semitones, so each chord quality is solved once with root C,
+# over a range extended 11 semitones down so that every transposition up to B is covered. The MinSumConstraint is
+# the only constraint that is not invariant under transposition; it is left out and checked after transposing.
+# With a deadline, a search that runs past it returns the solutions found so far and sets record["status"] to "budget".
+def canonicalSolutions(chord_type, relaxations=(), record=None, deadline=None, profile=None):
+    key = SOLUTION_CACHE.key(f"C:{chord_type}", "canonical", relaxations, profile)
+    solutions = SOLUTION_CACHE.get(key)
+    if solutions is not None:
+        return np.asarray(solutions, dtype=np.int16)
+    
+    lowest_note, highest_note = noteRange(relaxations, profile)
+    monitor = SearchMonitor(deadline) if record is not None or deadline is not None else None
+    problem, note_vars = buildProblem(f"C:{chord_type}", [], "simple", relaxations=relaxations, monitor=monitor,
+                                      note_range=(lowest_note - 11, highest_note), min_sum=False)
+    solutions, complete = collectSolutions(problem)
+    # one column per note variable, plus the bass note
+    solutions = np.asarray(formatSolutions(solutions, "simple"), dtype=np.int16).reshape(-1, len(note_vars) + 1)
+    if record is not None:
+        record["source"] = "csp"
+        describeProblem(record, problem, note_vars)
+        record["nodes"] = monitor.nodes
+    
+    if not complete:
+        if record is not None:
+            record["status"] = "budget"
+        return solutions
+    
+    SOLUTION_CACHE.put(key, solutions)
+    return solutions
+
+
+# Shifts canonical simple mode solutions up by the given number of semitones, and drops the ones that leave the
+# note range or break the MinSumConstraint, in a single vectorized check. Rows are sorted, lowest note first.
+def transposeSolutions(solutions, semitones, relaxations=(), profile=None):
+    if len(solutions) == 0:
+        return solutions
+    
+    lowest_note, highest_note = noteRange(relaxations, profile)
+    transposed = solutions + semitones
+    # as MinSumConstraint over every variable: the sum includes the bass note, the bound counts only the note
+    # variables (len(note_vars) * 50, the bass excluded)
+    min_sum = (transposed.shape[1] - 1) * 50
+    valid = (transposed[:, 0] >= lowest_note) & (transposed[:, -1] <= highest_note) & (transposed.sum(axis=1) >= min_sum)
+    return transposed[valid]
+
+
+# transposeSolutions() for the 12 semitone shifts 0-11 at once; returns the solutions of every shift
+def transposeAllKeys(solutions, relaxations=(), profile=None):
+    if len(solutions) == 0:
+        return [solutions] * 12
+    
+    lowest_note, highest_note = noteRange(relaxations, profile)
+    transposed = solutions[None, :, :] + np.arange(12, dtype=solutions.dtype)[:, None, None]
+    min_sum = (transposed.shape[2] - 1) * 50
+    valid = (transposed[:, :, 0] >= lowest_note) & (transposed[:, :, -1] <= highest_note) & (transposed.sum(axis=2) >= min_sum)
+    return [transposed[semitones][valid[semitones]] for semitones in range(12)]
+
+
+# Voicing index
+# Optional precomputed bundle of every voicing for the 12 roots; see modules/voicingIndex.py.
+# Simple mode entries are keyed by chord type, jazz and rootless entries by voicing family.
+# An index built from another voicing library (see modules/voicingLibrary.py) is ignored.
+VOICING_INDEX = None
+
+INDEX_ROOTS = ["C", "C#", "D", "Eb", "E", "F", "F#", "G", "Ab", "A", "Bb", "B"]
+
+
+def useVoicingIndex(path):
+    global VOICING_INDEX
+    VOICING_INDEX = VoicingIndex(path)
+    SOLUTION_CACHE.clear()
+    if VOICING_INDEX.library != VOICING_LIBRARY.digest:
+        logger.warning("Voicing index %s was built from another voicing library and is ignored; build it again.", path)
+
+
+def lookupVoicingIndex(current_chord, mode, relaxations=(), profile=None):
+    if VOICING_INDEX is None or VOICING_INDEX.library != VOICING_LIBRARY.digest:
+        return None
+    if VOICING_INDEX.note_range != noteRange(relaxations, profile) or "drop_spread" in relaxations:
+        return None
+    
+    current_chord_root = current_chord.split(':')[0]
+    current_chord_type = current_chord.split(':')[1]
+    if mode != "simple":
+        current_chord_type = voicingFamilyName(current_chord_type)
+    
+    return VOICING_INDEX.lookup(indexKey(pitchClass(current_chord_root), current_chord_type, mode))
+
+
+# Build step for the voicing index: enumerates every chord type and voicing family in all 12 roots
+def buildVoicingIndex(path):
+    entries = {}
+    for pitch_class, root in enumerate(INDEX_ROOTS):
+        for chord_type in CHORD_FORMULAS.keys():
+            entries[indexKey(pitch_class, chord_type, "simple")] = enumerateSolutions(f"{root}:{chord_type}", "simple")
+        
+        for mode in ["jazz", "rootless"]:
+            for family in VOICING_FAMILIES:
+                entries[indexKey(pitch_class, family, mode)] = enumerateSolutions(f"{root}:{family}", mode)
+    
+    writeVoicingIndex(path, entries, (LOWEST_NOTE, HIGHEST_NOTE), VOICING_LIBRARY.digest)
+
+
+# Voice leading mode
+# Candidates are every voicing with one note per chord tone, in any order (so inversions are included),
+# with neighbor notes at most an octave apart and the same MinSumConstraint as the CSP modes.
+# A chord keeps at most MAX_VOICELEADING_CANDIDATES of them, the closest first (smallest spread, then nearest to the
+# middle of the range), as the transition matrices grow with the product of two chords' counts. Only chords under
+# "drop_spread" have more.
+MAX_VOICELEADING_CANDIDATES = 2048
+
+def candidateVoicings(current_chord, relaxations=(), profile=None):
+    key = SOLUTION_CACHE.key(current_chord, "voiceleading", relaxations, profile)
+    candidates = SOLUTION_CACHE.get(key)
+    if candidates is not None:
+        return np.asarray(candidates, dtype=np.int16)
+    
+    note_dict = prepare_note_dict(current_chord.split(':')[0], current_chord.split(':')[1], noteRange(relaxations, profile))
+    domains = [value for value in note_dict.values() if value]
+    
+    # every combination of one note per chord tone, one row each, lowest note first
+    grid = np.stack(np.meshgrid(*domains, indexing='ij'), axis=-1).reshape(-1, len(domains))
+    grid = np.sort(grid, axis=1)
+    gaps = np.diff(grid, axis=1)
+    valid = (gaps > 0).all(axis=1) & (grid.sum(axis=1) >= len(domains) * 50)
+    if "drop_spread" not in relaxations:
+        valid &= (gaps <= 12).all(axis=1)
+    candidates = np.unique(grid[valid], axis=0).astype(np.int16)
+    if len(candidates) > MAX_VOICELEADING_CANDIDATES:
+        lowest_note, highest_note = noteRange(relaxations, profile)
+        spreads = candidates[:, -1].astype(np.int32) - candidates[:, 0]
+        centre_distances = np.abs(candidates.sum(axis=1) - len(domains) * (lowest_note + highest_note) / 2)
+        kept = np.lexsort((centre_distances, spreads))[:MAX_VOICELEADING_CANDIDATES]
+        candidates = candidates[np.sort(kept)]
+    
+    # kept in memory only; the disk cache holds the CACHED_MODES
+    SOLUTION_CACHE.remember(key, candidates)
+    return candidates
+
+
+# Transition cost matrices between the candidate voicings of two chords, shared by every progression;
+# TRANSITION_CACHE.stats() gives the hits and misses, and the bytes held (at most 128 MB by default).
+TRANSITION_CACHE = TransitionCache()
+
+
+# Globally optimal voice leading: a Viterbi pass over the candidate voicings finds the minimum-motion path
+# through the whole progression. Deterministic, and linear in the number of chords.
+def produceVoiceLeading(progression, relaxations=(), stats=None, profile=None):
+    return produceViterbiPath(progression, "voiceleading", candidateVoicings, TRANSITION_CACHE, relaxations, stats, profile)
+
+
+# Shared by the "voiceleading" and "satb" modes: the candidates of every chord come from candidate_function, the
+# transition costs from transition_cache, and a Viterbi pass picks the cheapest path. Infinite costs are forbidden
+# transitions; a progression with no path around them raises ValueError.
+def produceViterbiPath(progression, mode, candidate_function, transition_cache, relaxations=(), stats=None, profile=None):
+    candidate_sets = []
+    candidate_keys = []
+    for current_chord in progression:
+        start = time.perf_counter() if stats is not None else None
+        candidates = candidate_function(current_chord, relaxations, profile)
+        if stats is not None:
+            stats.add({"chord": current_chord, "mode": mode, "source": mode, "solutions": len(candidates),
+                       "seconds": time.perf_counter() - start, "solved": len(candidates) > 0})
+        if len(candidates) == 0:
+            error = f"No solution found for {current_chord} in {mode} mode."
+            raise ValueError(error)
+        candidate_sets.append(candidates)
+        candidate_keys.append(SOLUTION_CACHE.key(current_chord, mode, relaxations, profile))
+    
+    matrices = [transition_cache.matrix(candidate_keys[i], candidate_keys[i + 1], candidate_sets[i], candidate_sets[i + 1])
+                for i in range(len(candidate_sets) - 1)]
+    path = viterbiPath(candidate_sets, matrices=matrices)
+    if not np.isfinite(sum(matrix[i, j] for matrix, i, j in zip(matrices, path, path[1:]))):
+        error = f"No solution found for the progression in {mode} mode."
+        raise ValueError(error)
+    return [[int(note) for note in candidates[index]] for candidates, index in zip(candidate_sets, path)]
+
+
+# SATB mode
+# Four voices, bass to soprano, each in its own range, intersected with the profile's range. The bass takes the root,
+# and every essential chord tone is in some voice: a perfect fifth may be left out of four-note chords, and chords
+# with more tones keep the root, third, seventh and top extension. The upper voices are at most an octave apart, the
+# tenor at most a twelfth above the bass. The classical rules between chords are checked by satbTransitionMatrix
+# (see modules/voiceLeading.py), on every pair of candidates at once.
+# Relaxations: "widen_range" widens every voice range by a fourth (and the profile by an octave), "drop_spread"
+# drops the spacing limits.
+SATB_RANGES = [(noteNameToMidi("E2"), noteNameToMidi("C4")),   # bass
+               (noteNameToMidi("C3"), noteNameToMidi("G4")),   # tenor
+               (noteNameToMidi("G3"), noteNameToMidi("C5")),   # alto
+               (noteNameToMidi("C4"), noteNameToMidi("G5"))]   # soprano
+
+# largest interval between neighbor voices: bass-tenor, tenor-alto, alto-soprano
+SATB_SPACING = [19, 12, 12]
+
+SATB_TRANSITION_CACHE = TransitionCache(transition=satbTransitionMatrix)
+
+
+def satbCandidates(current_chord, relaxations=(), profile=None):
+    key = SOLUTION_CACHE.key(current_chord, "satb", relaxations, profile)
+    candidates = SOLUTION_CACHE.get(key)
+    if candidates is not None:
+        return np.asarray(candidates, dtype=np.int16).reshape(-1, 4)
+    
+    current_chord_root, current_chord_type = current_chord.split(':')
+    note_dict = prepare_note_dict(current_chord_root, current_chord_type, (0, 127))
+    roles = [role for role, value in note_dict.items() if value]
+    pitch_classes = {role: note_dict[role][0] % 12 for role in roles}
+    root = pitch_classes["root"]
+    
+    if len(roles) <= 3:
+        required = roles
+    elif len(roles) == 4:
+        required = [role for role in roles if not (role == "fifth" and (pitch_classes[role] - root) % 12 == 7)]
+    else:
+        required = ["root", "third", "seventh", roles[-1]]
+    allowed = roles if len(roles) <= 4 else required
+    required_pitch_classes = np.array([pitch_classes[role] for role in required])
+    allowed_pitch_classes = [pitch_classes[role] for role in allowed]
+    
+    widen = 5 if "widen_range" in relaxations else 0
+    lowest_note, highest_note = noteRange(relaxations, profile)
+    domains = []
+    for voice, (low, high) in enumerate(SATB_RANGES):
+        voice_pitch_classes = [root] if voice == 0 else allowed_pitch_classes
+        domains.append([note for note in range(max(low - widen, lowest_note), min(high + widen, highest_note) + 1)
+                        if note % 12 in voice_pitch_classes])
+    
+    # every combination of one note per voice, one row each, bass first
+    grid = np.stack(np.meshgrid(*domains, indexing='ij'), axis=-1).reshape(-1, 4).astype(np.int16)
+    gaps = np.diff(grid, axis=1)
+    valid = (gaps > 0).all(axis=1)
+    if "drop_spread" not in relaxations:
+        valid &= (gaps <= np.array(SATB_SPACING)).all(axis=1)
+    valid &= ((grid % 12)[:, :, None] == required_pitch_classes[None, None, :]).any(axis=1).all(axis=1)
+    candidates = grid[valid]
+    
+    # kept in memory only; the disk cache holds the CACHED_MODES
+    SOLUTION_CACHE.remember(key, candidates)
+    return candidates
+
+
+def produceSATB(progression, relaxations=(), stats=None, profile=None):
+    return produceViterbiPath(progression, "satb", satbCandidates, SATB_TRANSITION_CACHE, relaxations, stats, profile)
+
+
+# Candidate voicings of one chord, the ones produceNotes picks from.
+# Modes that depend on the previous chord ("smooth"), or any CSP mode with streaming=True, stream their solutions
+# through sampleSolution instead of enumerating them all; max_candidates stops the search early.
+# stats, a SolverStats, gets one record for the chord; without it nothing is measured.
+# time_budget, in seconds, makes the search anytime: once it runs out, the search stops and the solutions found so far
+# are used, or fallbackVoicing if there are none. record["status"] tells which: "optimal" (the search completed),
+# "budget" (cut off, with solutions) or "fallback". Chords with no solution at all still raise ValueError.
+# record, a dictionary, is filled in as the stats record of the chord even without stats, to read its status.
+# In "ranked" mode the candidates are the top_k voicings under cost; see rankVoicings. In "auto" mode the candidate is
+# the winner of raceModes, under the same cost.
+def candidateSolutions(current_chord, notes_so_far=None, mode="simple", relaxations=(), rng=None, streaming=False, max_candidates=None, stats=None,
+                       time_budget=None, top_k=1, cost=None, profile=None, record=None):
+
+    notes_so_far = notes_so_far or []
+    rng = rng or random
+    deadline = None
+    start = time.perf_counter()
+    if record is not None or stats is not None or time_budget is not None:
+        record = record if record is not None else {}
+        record["chord"] = current_chord
+    if time_budget is not None:
+        deadline = start + time_budget
+    
+    if "simple" in relaxations:
+        mode = "simple"
+    
+    if isIndependentMode(mode, relaxations, streaming):
+        formatted_solutions = enumerateSolutions(current_chord, mode, relaxations, record, deadline, profile)
+    elif mode == "voiceleading":
+        if record is not None:
+            record["source"] = "voiceleading"
+        formatted_solutions = candidateVoicings(current_chord, relaxations, profile)
+        if notes_so_far and len(formatted_solutions) > 0:
+            # on its own, a chord takes the candidate closest to the previous chord
+            distances = distanceMatrix([notes_so_far[-1]], formatted_solutions)[0]
+            formatted_solutions = formatted_solutions[distances == distances.min()]
+    elif mode == "satb":
+        if record is not None:
+            record["source"] = "satb"
+        formatted_solutions = satbCandidates(current_chord, relaxations, profile)
+        if notes_so_far and len(notes_so_far[-1]) == 4 and len(formatted_solutions) > 0:
+            # on its own, a chord takes the smoothest candidate that breaks no rule from the previous chord
+            costs = satbTransitionMatrix([notes_so_far[-1]], formatted_solutions)[0]
+            formatted_solutions = formatted_solutions[(costs == costs.min()) & np.isfinite(costs)]
+    elif mode == "auto":
+        formatted_solutions = raceModes(current_chord, notes_so_far, relaxations, rng, cost, time_budget, stats, record, profile)
+    elif mode == "ranked":
+        formatted_solutions = rankVoicings(current_chord, notes_so_far, top_k, cost, relaxations, record, profile)
+    else:
+        monitor = SearchMonitor(deadline) if record is not None else None
+        problem, note_vars = buildProblem(current_chord, notes_so_far, mode, relaxations=relaxations, rng=rng, monitor=monitor, profile=profile)
+        if record is not None:
+            record["source"] = "stream"
+            describeProblem(record, problem, note_vars)
+        formatted_solution, count, complete = sampleSolution(problem, mode, rng, max_candidates)
+        formatted_solutions = [formatted_solution] if formatted_solution else []
+        if record is not None:
+            record["nodes"] = monitor.nodes
+            if not complete:
+                record["status"] = "budget"
+    
+    if record is not None:
+        record.setdefault("status", "optimal")
+        if record["status"] == "budget" and len(formatted_solutions) == 0:
+            formatted_solutions = [fallbackVoicing(current_chord, mode, profile)]
+            record["status"] = "fallback"
+        record["mode"] = mode
+        record["solutions"] = count if record["source"] == "stream" else len(formatted_solutions)
+        record["seconds"] = time.perf_counter() - start
+        record["solved"] = len(formatted_solutions) > 0
+        if stats is not None:
+            stats.add(record)
+    
+    return formatted_solutions
+
+
+# Ranked mode
+# The top_k voicings of lowest cost, found by best-first search over the chord roles of simple mode, lowest first
+# (see modules/voicingSearch.py). The root may be doubled an octave below, at the cost's doubled_root price.
+# cost is a VoicingCost, DEFAULT_VOICING_COST if not given; its motion term uses the last chord of notes_so_far.
+DEFAULT_VOICING_COST = VoicingCost()
+
+def rankVoicings(current_chord, notes_so_far=(), top_k=1, cost=None, relaxations=(), record=None, profile=None):
+    current_chord_root, current_chord_type = current_chord.split(':')
+    note_range = noteRange(relaxations, profile)
+    note_dict = prepare_note_dict(current_chord_root, current_chord_type, note_range)
+    domains = [value for value in note_dict.values() if value]
+    previous = notes_so_far[-1] if len(notes_so_far) > 0 and "drop_smooth" not in relaxations else None
+    max_spread = None if "drop_spread" in relaxations else 12
+    
+    ranked, expanded = topVoicings(domains, top_k, cost or DEFAULT_VOICING_COST, pitchClass(current_chord_root), previous,
+                                   max_spread, len(domains) * 50, note_range)
+    if record is not None:
+        record["source"] = "ranked"
+        record["variables"] = len(domains)
+        record["domain_sizes"] = [len(domain) for domain in domains]
+        record["nodes"] = expanded
+    return [notes for _, notes in ranked]
+
+
+# Auto mode
+# Every mode of AUTO_MODES voices the chord with produceNotes, each in a thread of AUTO_POOL, and the voicing of lowest
+# cost (a VoicingCost, DEFAULT_VOICING_COST if not given, with the previous chord for its motion term) wins; ties go
+# to the mode listed first. Modes that find no voicing drop out.
+# With a time_budget, the race ends at the deadline with the modes done by then, or with the first one to finish if
+# none is; the others keep running in the background, their own search cut off by the same budget.
+AUTO_MODES = ["simple", "jazz", "rootless", "smooth"]
+
+AUTO_POOL = None
+
+
+def autoPool():
+    global AUTO_POOL
+    if AUTO_POOL is None:
+        AUTO_POOL = ThreadPoolExecutor(max_workers=len(AUTO_MODES), thread_name_prefix="auto")
+    return AUTO_POOL
+
+
+def raceModes(current_chord, notes_so_far=(), relaxations=(), rng=None, cost=None, time_budget=None, stats=None, record=None, profile=None):
+    rng = rng or random
+    cost = cost or DEFAULT_VOICING_COST
+    previous = notes_so_far[-1] if len(notes_so_far) > 0 else None
+    
+    # one seeded generator per mode, drawn in order, so a seeded rng gives the same result whichever thread runs first
+    futures = {}
+    mode_records = {}
+    for mode in AUTO_MODES:
+        mode_rng = random.Random(rng.random())
+        mode_records[mode] = {}
+        futures[autoPool().submit(produceNotes, current_chord, list(notes_so_far), mode, relaxations=relaxations, rng=mode_rng,
+                                  stats=stats, time_budget=time_budget, profile=profile, record=mode_records[mode])] = mode
+    
+    done, not_done = wait(futures, timeout=time_budget)
+    if not done:
+        done, not_done = wait(futures, return_when=FIRST_COMPLETED)
+    
+    root_pitch_class = pitchClass(current_chord.split(':')[0])
+    scores = {}
+    for future in done:
+        try:
+            notes = future.result()
+        except ValueError:
+            continue
+        scores[futures[future]] = (cost.cost(notes, root_pitch_class, previous), notes)
+    
+    if record is not None:
+        record["source"] = "auto"
+        record["costs"] = {mode: score for mode, (score, notes) in scores.items()}
+        record["unfinished"] = [futures[future] for future in not_done]
+        if not_done:
+            record["status"] = "budget"
+    if not scores:
+        return []
+    
+    winner = min(scores, key=lambda mode: (scores[mode][0], AUTO_MODES.index(mode)))
+    if record is not None:
+        record["winner"] = winner
+        # the winner's own search may have been cut off, or answered with the fallback voicing
+        winner_status = mode_records[winner].get("status")
+        if winner_status == "fallback":
+            record["status"] = "fallback"
+        elif winner_status == "budget":
+            record["status"] = "budget"
+    return [scores[winner][1]]
+
+
+# CSP Solver function
+# rng makes the choice reproducible when given a seeded random.Random.
+# See candidateSolutions for streaming, max_candidates, stats, time_budget, top_k, cost and record, and produceAllNotes for profile.
+# In "ranked" mode the voicing is picked at random among the top_k best, so top_k=1 always gives the best one.
+def produceNotes(current_chord, notes_so_far=None, mode="simple", list_of_voicings=None, relaxations=(), rng=None, streaming=False, max_candidates=None, stats=None,
+                 time_budget=None, top_k=1, cost=None, profile=None, record=None):
+
+    rng = rng or random
+    formatted_solutions = candidateSolutions(current_chord, notes_so_far, mode, relaxations, rng, streaming, max_candidates, stats, time_budget,
+                                             top_k, cost, profile, record)
+    return pickSolution(formatted_solutions, rng)
+
+
+def pickSolution(formatted_solutions, rng=random):
+    if len(formatted_solutions) > 0:
+        # index entries are padded with 0, which is never a valid note
+        formatted_solution = [int(note) for note in rng.choice(formatted_solutions) if note]
         
         return formatted_solution
     else: 
@@ -414,13 +1393,16 @@ def produceNotes(current_chord, notes_so_far=list, mode="simple", list_of_voicin
 
 
 def translateVoicing(list_of_voicings):
-    # This function is used to translate the list number into assigned strings; for example, 1 -> "simple", 2 -> "jazz", 3 -> "rootless", 4 -> "smooth".
+    # This function is used to translate the list number into assigned strings; for example, 1 -> "simple", 2 -> "jazz", 3 -> "rootless", 4 -> "smooth", 5 -> "ranked", 6 -> "satb", 7 -> "auto".
     # This is used to make the code more readable and user-friendly.
     translation = {
         "1": "simple",
         "2": "jazz",
         "3": "rootless",
-        "4": "smooth"
+        "4": "smooth",
+        "5": "ranked",
+        "6": "satb",
+        "7": "auto"
     }
     
     return [translation[voicing] for voicing in list_of_voicings]
@@ -0,0 +1,72 @@
+from functools import lru_cache
+
+from modules.utils import *
+
+'''
+Instrument range profiles.
+
+A profile is a named (lowest, highest) midi range the voicings must fit in. The notes of every pitch class inside
+the range, and inside the range widened by an octave on each side (the "widen_range" relaxation), are built once
+when the profile is created, so building the domains of a chord is only a lookup.
+'''
+
+
+'''
+Notes of every pitch class between lowest and highest, both included: a tuple of 12 tuples, C first.
+Cached, so each range is expanded only once.
+'''
+@lru_cache(maxsize=None)
+def rangeDomains(lowest, highest):
+    return tuple(tuple(octaveExpansion(pitch_class, lowest, highest)) for pitch_class in range(12))
+
+
+class RangeProfile:
+    def __init__(self, name, lowest, highest):
+        self.name = name
+        self.lowest = noteNameToMidi(lowest) if isinstance(lowest, str) else lowest
+        self.highest = noteNameToMidi(highest) if isinstance(highest, str) else highest
+        if self.lowest > self.highest:
+            error = f"Range profile {name} has its lowest note above its highest note."
+            raise ValueError(error)
+
+        self.domains = rangeDomains(*self.noteRange())
+        self.widened_domains = rangeDomains(*self.noteRange(("widen_range",)))
+
+    def noteRange(self, relaxations=()):
+        if "widen_range" in relaxations:
+            return (self.lowest - 12, self.highest + 12)
+        return (self.lowest, self.highest)
+
+    def domain(self, pitch_class, relaxations=()):
+        domains = self.widened_domains if "widen_range" in relaxations else self.domains
+        return domains[pitch_class % 12]
+
+    def __repr__(self):
+        return f"RangeProfile({self.name!r}, {self.lowest}, {self.highest})"
+
+
+PROFILES = {
+    "default": RangeProfile("default", "C2", "G5"),
+    "piano_lh": RangeProfile("piano_lh", "C2", "G4"),
+    "piano_rh": RangeProfile("piano_rh", "C4", "C7"),
+    "guitar": RangeProfile("guitar", "E2", "B5"),
+    "strings": RangeProfile("strings", "C2", "E7"),
+    "satb": RangeProfile("satb", "E2", "C6"),
+}
+
+DEFAULT_PROFILE = PROFILES["default"]
+
+
+'''
+Resolves a profile argument: None is DEFAULT_PROFILE, a string is looked up in PROFILES, and a RangeProfile is
+used as is.
+'''
+def rangeProfile(profile=None):
+    if profile is None:
+        return DEFAULT_PROFILE
+    if isinstance(profile, RangeProfile):
+        return profile
+    if profile not in PROFILES:
+        error = f"Range profile not recognized: {profile}"
+        raise ValueError(error)
+    return PROFILES[profile]
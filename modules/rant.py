@@ -1,4 +1,3 @@
-from music21 import *
 from modules.utils import *
 import random
 
@@ -43,6 +42,30 @@ def rant(formatted_progression, level):
 
     
 
+'''
+rant() for a single chord, for streaming use where the chords come one at a time; see modules/liveVoicer.py.
+Levels 0 to 2 work chord by chord, so the result is the same as the chord's entry in rant().
+params:
+    chord: a formatted chord symbol, e.g. "D:min7".
+    level: as in rant().
+
+returns:
+    the altered chord symbol.
+'''
+def rantChord(chord, level):
+    if level == 0:
+        return turnIntoTriad(chord)
+    
+    elif level == 1:
+        return chord
+    
+    elif level == 2:
+        return substituteChord(chord)
+    
+    error = "Reharmonization level not implemented for streaming."
+    raise ValueError(error)
+
+
 
 # for level 0 process
 def simplifyChords(progression):
@@ -99,26 +122,7 @@ def substituteChords(progression):
     # Iterate over each bar in the progression
     for bar in range(len(new_prog)):
         for i, chord in enumerate(new_prog[str(bar)]):
-            root = chord.split(":")[0]
-            modifier = chord.split(":")[1]
-            # Check for tritone substitution conditions
-            if modifier == "7" or modifier == "9": 
-                altered_chord = tritoneSubstitution(chord)
-                # Replace the old chord with the new one
-                new_prog[str(bar)][i] = altered_chord
-            
-            elif modifier == ("maj7" or "maj"):
-                altered_chord = tonicSubstitution(chord) if random.choice([True, False]) else chord
-                new_prog[str(bar)][i] = altered_chord
-                
-            elif modifier == "min7":
-                altered_chord = dominantModalSubstitution(chord)
-                new_prog[str(bar)][i] = altered_chord
-            
-            # happens at random
-            if random.choice([True, False]) and ("maj" not in modifier):
-                altered_chord = lowerByMajorThird(chord)
-                new_prog[str(bar)][i] = altered_chord
+            new_prog[str(bar)][i] = substituteChord(chord)
     
     return new_prog
 
@@ -181,6 +185,31 @@ def substituteChords(progression):
 
 
     
+'''
+Level 2 substitution of a single chord; substituteChords() applies it to every chord of a progression.
+'''
+def substituteChord(chord):
+    root = chord.split(":")[0]
+    modifier = chord.split(":")[1]
+    altered_chord = chord
+    # Check for tritone substitution conditions
+    if modifier == "7" or modifier == "9": 
+        altered_chord = tritoneSubstitution(chord)
+    
+    elif modifier == ("maj7" or "maj"):
+        altered_chord = tonicSubstitution(chord) if random.choice([True, False]) else chord
+        
+    elif modifier == "min7":
+        altered_chord = dominantModalSubstitution(chord)
+    
+    # happens at random
+    if random.choice([True, False]) and ("maj" not in modifier):
+        altered_chord = lowerByMajorThird(chord)
+    
+    return altered_chord
+
+
+
 '''Tritone substitution functionalities'''    
 def tritoneSubstitution(chord):
         root = chord.split(":")[0]
@@ -213,28 +242,19 @@ def tonicSubstitution(chord):
     root = chord.split(":")[0]
     modifier = chord.split(":")[1]
     
-    root_pitch = pitch.Pitch(root)
-    root_midi = root_pitch.midi
+    root_midi = noteNameToMidi(root)
 
     if modifier == "maj7":    
         # Randomly choose between iii and vi
         if random.choice([True, False]):
-            new_pitch = pitch.Pitch()
-            new_pitch.midi = root_midi - 3
-            return f"{new_pitch.name}:min7"
+            return f"{midiToName(root_midi - 3)}:min7"
         else:
-            new_pitch = pitch.Pitch()
-            new_pitch.midi = root_midi + 4
-            return f"{new_pitch.name}:min7"
+            return f"{midiToName(root_midi + 4)}:min7"
     elif modifier == "maj":
         if random.choice([True, False]):
-            new_pitch = pitch.Pitch()
-            new_pitch.midi = root_midi - 3
-            return f"{new_pitch.name}:min"
+            return f"{midiToName(root_midi - 3)}:min"
         else:
-            new_pitch = pitch.Pitch()
-            new_pitch.midi = root_midi + 4
-            return f"{new_pitch.name}:min"
+            return f"{midiToName(root_midi + 4)}:min"
 
 
 def dominantModalSubstitution(chord):
@@ -249,9 +269,7 @@ def dominantModalSubstitution(chord):
 def lowerByMajorThird(chord):
     root = chord.split(":")[0]
     modifier = chord.split(":")[1]
-    root_pitch = pitch.Pitch(root)
-    root_pitch.midi -= 4
-    return f"{root_pitch.name}:{modifier}"
+    return f"{midiToName(noteNameToMidi(root) - 4)}:{modifier}"
 
 
 
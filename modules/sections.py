@@ -0,0 +1,110 @@
+import string
+
+'''
+Sections of a song form.
+
+A section is a (label, start, stop) span of bars, stop excluded, and the sections of a progression follow each other
+from its first bar to its last. They come from a form string ("AABA": equal sections, one per letter) or are detected
+from repeated runs of bars. Sections with the same bars are voiced once; see produceAllNotesBySection in
+modules/noteSolver.py.
+'''
+
+# Polynomial hash of a run of bars, over the integer id of every distinct bar
+SECTION_HASH_BASE = 1000003
+SECTION_HASH_MODULUS = (1 << 61) - 1
+
+
+'''
+Equal sections, one per letter of form, e.g. "AABA" over 32 bars gives four 8-bar sections.
+'''
+def sectionsFromForm(form, bar_count):
+    if not form or bar_count % len(form) != 0:
+        error = f"Form {form} does not split {bar_count} bars into equal sections."
+        raise ValueError(error)
+    length = bar_count // len(form)
+    return [(label, i * length, (i + 1) * length) for i, label in enumerate(form)]
+
+
+'''
+Sections from repeated runs of bars.
+Runs start and end on a grid of grid bars (4 by default, the usual phrase length). The longest runs are matched
+first: a run is a repeat if the same bars already appeared, entirely before it, at a grid position, and if no longer
+repeat covers it already. Runs are compared by rolling hash, then checked bar by bar. Both the repeat and the run it
+repeats become sections of their own, split at the same places, and sections get one label per distinct content, in
+order of appearance: A, B, C...
+Repeats off the grid, as after a pickup bar, are not found; the bars are then voiced as new material. The labels
+name the sections found, which are often shorter than the sections of the song form.
+params:
+    bars: list of bars, each a list of chord symbols.
+    grid: length, in bars, of the shortest repeat, and the grid runs start on.
+'''
+def detectSections(bars, grid=4):
+    bar_ids = {}
+    ids = [bar_ids.setdefault(tuple(bar), len(bar_ids)) for bar in bars]
+    count = len(ids)
+
+    # the hash of bars[i:j] is (prefix[j] - prefix[i] * power[j - i]) mod SECTION_HASH_MODULUS
+    prefix = [0]
+    power = [1]
+    for bar_id in ids:
+        prefix.append((prefix[-1] * SECTION_HASH_BASE + bar_id + 1) % SECTION_HASH_MODULUS)
+        power.append(power[-1] * SECTION_HASH_BASE % SECTION_HASH_MODULUS)
+
+    def runHash(start, stop):
+        return (prefix[stop] - prefix[start] * power[stop - start]) % SECTION_HASH_MODULUS
+
+    starts = range(0, count, grid)
+    covered = [False] * count
+    boundaries = {0, count}
+    matches = []
+    for length in range(count // 2 // grid * grid, grid - 1, -grid):
+        # first grid position of every run of this length
+        first_starts = {}
+        for start in starts:
+            if start + length <= count:
+                first_starts.setdefault(runHash(start, start + length), start)
+
+        for repeat in starts:
+            if repeat + length > count or any(covered[repeat:repeat + length]):
+                continue
+            start = first_starts.get(runHash(repeat, repeat + length))
+            if start is None or start + length > repeat or ids[start:start + length] != ids[repeat:repeat + length]:
+                continue
+            matches.append((start, repeat, length))
+            boundaries.update((start, start + length, repeat, repeat + length))
+            covered[repeat:repeat + length] = [True] * length
+
+    # a run and its repeat are split at the same places, so that their sections have the same content
+    changed = True
+    while changed:
+        changed = False
+        for start, repeat, length in matches:
+            for source, target in ((start, repeat), (repeat, start)):
+                for edge in [edge for edge in boundaries if source < edge < source + length]:
+                    if edge - source + target not in boundaries:
+                        boundaries.add(edge - source + target)
+                        changed = True
+
+    sections = []
+    labels = {}
+    edges = sorted(boundaries)
+    for start, stop in zip(edges, edges[1:]):
+        content = tuple(ids[start:stop])
+        labels.setdefault(content, sectionLabel(len(labels)))
+        sections.append((labels[content], start, stop))
+    return sections
+
+
+def sectionLabel(index):
+    letter = string.ascii_uppercase[index % 26]
+    return letter if index < 26 else f"{letter}{index // 26}"
+
+
+'''
+Sections of bars as spans of chord indices, for a progression flattened bar after bar.
+'''
+def sectionChordSpans(sections, bars):
+    chord_starts = [0]
+    for bar in bars:
+        chord_starts.append(chord_starts[-1] + len(bar))
+    return [(label, chord_starts[start], chord_starts[stop]) for label, start, stop in sections]
@@ -0,0 +1,53 @@
+import json
+
+'''
+Per-chord solver statistics.
+
+Pass a SolverStats object as the stats argument of produceNotes / produceAllNotes and every solved chord appends
+one record to it. Without one, nothing is measured. A record is a dictionary with:
+    chord: the chord symbol.
+    mode: the voicing mode actually used.
+    source: where the voicings came from: "cache", "index", "transposed", "csp", "closed_form", "stream", "voiceleading", "satb", "ranked" or "auto".
+            "csp" for simple mode means the chord quality was solved in C, then transposed.
+    variables: number of note variables (for the CSP sources).
+    domain_sizes: domain size of every note variable, before search (for the CSP sources).
+    solutions: number of candidate voicings found (for "stream", only those visited).
+    nodes: search nodes visited (for the CSP sources), or partial voicings expanded (for "ranked").
+    seconds: wall time spent on the chord.
+    relaxation: the relaxation ladder step the chord was solved under.
+    attempt: the attempt at that step, from 1; a progression is tried again at the same step after a failure in the
+            randomized modes (see produceAllNotesWithFallback), so the earlier attempts' records have lower numbers.
+    solved: False if no voicing was found.
+    costs, winner, unfinished: for "auto", the cost of every mode's voicing, the mode that won, and the modes
+            still running when the time budget ran out.
+    status: "optimal" if the search completed, "budget" if the time budget cut it off after finding voicings,
+            "fallback" if it was cut off before any and the fallback voicing was used.
+'''
+class SolverStats:
+    def __init__(self):
+        self.records = []
+        self.retries = 0
+        self.relaxation = "none"
+        self.attempt = 1
+
+    def add(self, record):
+        record.setdefault("relaxation", self.relaxation)
+        record.setdefault("attempt", self.attempt)
+        self.records.append(record)
+
+    def write_jsonl(self, filename):
+        with open(filename, 'w') as file:
+            for record in self.records:
+                file.write(json.dumps(record) + "\n")
+
+    '''
+    Total time, calls and solution count per chord symbol, most expensive first.
+    '''
+    def summary(self):
+        per_chord = {}
+        for record in self.records:
+            entry = per_chord.setdefault(record["chord"], {"chord": record["chord"], "calls": 0, "seconds": 0.0, "solutions": 0})
+            entry["calls"] += 1
+            entry["seconds"] += record["seconds"]
+            entry["solutions"] += record.get("solutions") or 0
+        return sorted(per_chord.values(), key=lambda entry: entry["seconds"], reverse=True)
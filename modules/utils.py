@@ -0,0 +1,108 @@
+'''
+Integer pitch-class core.
+
+Pitches are plain midi integers and pitch classes are integers 0-11 (C = 0). Note names follow music21:
+a letter, any number of accidentals ("#" sharp, "b" or "-" flat) and an optional octave, with middle C = C4 = 60.
+Names without an octave sit in octave 4, so noteNameToMidi("Cb") is 59 and noteNameToMidi("B#") is 72,
+exactly like music21.pitch.Pitch(name).midi, but without constructing a Pitch or importing music21.
+'''
+
+LETTER_PITCH_CLASSES = {"C": 0, "D": 2, "E": 4, "F": 5, "G": 7, "A": 9, "B": 11}
+
+ACCIDENTAL_SEMITONES = {"#": 1, "b": -1, "-": -1}
+
+# Spellings for pitch class 0-11. MUSIC21_NAMES is what music21 gives a Pitch built from a midi value.
+MUSIC21_NAMES = ["C", "C#", "D", "E-", "E", "F", "F#", "G", "G#", "A", "B-", "B"]
+SHARP_NAMES = ["C", "C#", "D", "D#", "E", "F", "F#", "G", "G#", "A", "A#", "B"]
+FLAT_NAMES = ["C", "Db", "D", "Eb", "E", "F", "Gb", "G", "Ab", "A", "Bb", "B"]
+
+SPELLINGS = {"music21": MUSIC21_NAMES, "sharp": SHARP_NAMES, "flat": FLAT_NAMES}
+
+
+'''
+Splits a note name into its letter, accidental offset in semitones and octave (None if not given).
+'''
+def parseNoteName(name):
+    letter = name[0].upper()
+    if letter not in LETTER_PITCH_CLASSES:
+        raise ValueError(f"Note name not recognized: {name}")
+
+    accidental = 0
+    i = 1
+    while i < len(name) and name[i] in ACCIDENTAL_SEMITONES:
+        accidental += ACCIDENTAL_SEMITONES[name[i]]
+        i += 1
+
+    octave = int(name[i:]) if i < len(name) else None
+    return letter, accidental, octave
+
+
+def noteNameToMidi(name, octave=4):
+    letter, accidental, name_octave = parseNoteName(name)
+    if name_octave is not None:
+        octave = name_octave
+    return 12 * (octave + 1) + LETTER_PITCH_CLASSES[letter] + accidental
+
+
+def pitchClass(name):
+    letter, accidental, octave = parseNoteName(name)
+    return (LETTER_PITCH_CLASSES[letter] + accidental) % 12
+
+
+'''
+Name of a pitch class, in the given spelling: "music21" (C# E- B-...), "sharp" or "flat".
+'''
+def spellPitchClass(pitch_class, spelling="music21"):
+    return SPELLINGS[spelling][pitch_class % 12]
+
+
+'''
+Name of a midi value without its octave, spelled the way music21 respells a Pitch whose midi value was set.
+'''
+def midiToName(midi, spelling="music21"):
+    return spellPitchClass(midi % 12, spelling)
+
+
+def transposeName(name, semitones, spelling="music21"):
+    return spellPitchClass(pitchClass(name) + semitones, spelling)
+
+
+'''
+Every midi value of a pitch class between lowest and highest, both included, from low to high.
+'''
+def octaveExpansion(pitch_class, lowest, highest):
+    first = lowest + (pitch_class - lowest) % 12
+    return list(range(first, highest + 1, 12))
+
+
+'''
+Turns a chord symbol as written ("Dm7", "GM9", "Bb") into the solver's root:type form ("D:min7", "G:maj9", "Bb:maj").
+'''
+def formatChord(chord):
+    if chord is None:
+        return None
+    
+    root = chord[0]
+    formatted_chord = ""
+    
+    # Check for accidentals (sharp or flat)
+    if len(chord) > 1 and (chord[1] == '#' or chord[1] == 'b'):
+        root += chord[1]
+        remainder = chord[2:]
+    else:
+        remainder = chord[1:]
+    
+    # Ensure proper formatting for minor, major, and diminished chords
+    if "m" in remainder and not any(sub in remainder for sub in ["maj", "min", "dim"]):
+        remainder = remainder.replace("m", "min")
+    
+    if "M" in remainder and "Maj" not in remainder:
+        remainder = remainder.replace("M", "maj")
+        
+    if remainder == "":
+        remainder = "maj"
+    
+    # Form the formatted chord
+    formatted_chord = root + ":" + remainder.lower()
+    
+    return formatted_chord
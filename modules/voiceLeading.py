@@ -0,0 +1,149 @@
+import numpy as np
+from collections import OrderedDict
+
+'''
+Whole-progression voice leading.
+
+Each chord comes with an array of candidate voicings, shape (count, notes). The motion between two voicings
+is the sum, over every note of either voicing, of the distance to the nearest note of the other voicing,
+so voicings of different sizes can be compared. A Viterbi pass then picks the path of minimum total motion.
+'''
+
+
+'''
+Motion cost between every pair of candidate voicings of two adjacent chords.
+params:
+    previous: (m, p) array of candidate voicings of the first chord.
+    current: (n, q) array of candidate voicings of the second chord.
+
+returns:
+    (m, n) array; entry [i, j] is the motion from previous[i] to current[j].
+The distances are taken one pair of note columns at a time, so memory stays O(m * n) whatever the voicing sizes.
+'''
+def distanceMatrix(previous, current):
+    previous = np.asarray(previous, dtype=np.int32)
+    current = np.asarray(current, dtype=np.int32)
+    total = np.zeros((len(previous), len(current)), dtype=np.int32)
+    for voicings, others, transpose in ((previous, current, False), (current, previous, True)):
+        for column in voicings.T:
+            # distance from this note of every voicing to the nearest note of every other voicing
+            nearest = np.abs(column[:, None] - others[None, :, 0])
+            for other_column in others.T[1:]:
+                np.minimum(nearest, np.abs(column[:, None] - other_column[None, :]), out=nearest)
+            total += nearest.T if transpose else nearest
+    return total
+
+
+
+'''
+Four-part (SATB) transitions, with the classical voice-leading rules checked as array operations.
+Voicings are (bass, tenor, alto, soprano) rows. A transition between two voicings is forbidden if it has
+    parallel fifths or octaves: two voices a fifth or an octave (or unison) apart both before and after, and both
+        moving;
+    voice overlap: a voice moves past where its neighbor was in the previous chord;
+    large leaps: a voice moves further than max_leaps semitones.
+params:
+    previous: (m, 4) array of voicings of the first chord.
+    current: (n, 4) array of voicings of the second chord.
+    max_leaps: largest motion of every voice, bass first.
+
+returns:
+    (m, n) array: total motion of the four voices, or inf for a forbidden transition.
+'''
+def satbTransitionMatrix(previous, current, max_leaps=(12, 9, 9, 9)):
+    previous = np.asarray(previous, dtype=np.int16)[:, None, :]
+    current = np.asarray(current, dtype=np.int16)[None, :, :]
+    motion = current - previous
+    allowed = (np.abs(motion) <= np.asarray(max_leaps, dtype=np.int16)).all(axis=2)
+
+    # no voice goes above the previous note of the voice over it, or below the previous note of the voice under it
+    allowed &= (current[:, :, :-1] <= previous[:, :, 1:]).all(axis=2)
+    allowed &= (current[:, :, 1:] >= previous[:, :, :-1]).all(axis=2)
+
+    # every pair of voices, lower voice first
+    lower, upper = np.triu_indices(4, k=1)
+    previous_intervals = (previous[:, :, upper] - previous[:, :, lower]) % 12
+    current_intervals = (current[:, :, upper] - current[:, :, lower]) % 12
+    perfect = (previous_intervals == current_intervals) & ((current_intervals == 0) | (current_intervals == 7))
+    moving = (motion[:, :, lower] != 0) & (motion[:, :, upper] != 0)
+    allowed &= ~(perfect & moving).any(axis=2)
+
+    return np.where(allowed, np.abs(motion).sum(axis=2), np.inf)
+
+
+'''
+LRU cache of transition cost matrices, keyed by the pair of chords.
+The candidate voicings of a chord only depend on its key (chord symbol, range, relaxations), so the matrix between
+two keys is the same in every progression they meet in. Matrices are returned read-only.
+One matrix can take megabytes, so the cache is bounded by the bytes of its matrices (max_bytes) as well as by their
+number (maxsize); a matrix larger than max_bytes on its own is returned without being kept.
+'''
+class TransitionCache:
+    def __init__(self, maxsize=512, transition=distanceMatrix, max_bytes=128 * 2 ** 20):
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self.transition = transition
+        self.entries = OrderedDict()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def matrix(self, previous_key, current_key, previous, current):
+        key = (previous_key, current_key)
+        if key in self.entries:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return self.entries[key]
+
+        self.misses += 1
+        matrix = self.transition(previous, current)
+        matrix.setflags(write=False)
+        self.entries[key] = matrix
+        self.nbytes += matrix.nbytes
+        while self.entries and (len(self.entries) > self.maxsize or self.nbytes > self.max_bytes):
+            self.nbytes -= self.entries.popitem(last=False)[1].nbytes
+        return matrix
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self.entries), "bytes": self.nbytes,
+                "hit_rate": self.hits / lookups if lookups else 0.0}
+
+    def clear(self):
+        self.entries.clear()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+
+
+'''
+Minimum-motion path through the candidate voicings of a progression.
+params:
+    candidate_sets: list with one (count, notes) array of candidate voicings per chord.
+    transition: function returning the (m, n) cost matrix between two candidate sets; distanceMatrix by default.
+    matrices: optional list of precomputed cost matrices, one per pair of adjacent chords; transition is then unused.
+
+returns:
+    path: list with the index of the chosen candidate for each chord. Ties go to the lowest index,
+          so the result is deterministic.
+'''
+def viterbiPath(candidate_sets, transition=distanceMatrix, matrices=None):
+    if not candidate_sets:
+        return []
+
+    if matrices is None:
+        matrices = [transition(previous, current) for previous, current in zip(candidate_sets, candidate_sets[1:])]
+
+    costs = np.zeros(len(candidate_sets[0]))
+    back_pointers = []
+    for matrix in matrices:
+        total = costs[:, None] + matrix
+        best_previous = total.argmin(axis=0)
+        back_pointers.append(best_previous)
+        costs = total[best_previous, np.arange(total.shape[1])]
+
+    path = [int(costs.argmin())]
+    for best_previous in reversed(back_pointers):
+        path.append(int(best_previous[path[-1]]))
+    path.reverse()
+    return path
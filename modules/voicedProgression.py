@@ -0,0 +1,152 @@
+import numpy as np
+
+try:
+    import mido
+except ImportError:
+    mido = None
+
+'''
+Array-backed voiced progressions.
+
+A VoicedProgression stores the notes of every chord one after the other in a single int16 array, with an offsets
+array marking where each chord starts (chord i is notes[offsets[i]:offsets[i + 1]]) and the duration of every chord,
+in quarter notes. Chords come back as views of the notes array, without copying, and the whole progression is three
+arrays instead of a list of lists of Python ints, which is what batch jobs keep in memory.
+
+It is written straight to MIDI with mido, or through music21 when mido is not installed, and to a piano roll.
+'''
+
+
+class VoicedProgression:
+    __slots__ = ("notes", "offsets", "durations")
+
+    def __init__(self, notes, offsets, durations=None):
+        self.notes = np.asarray(notes, dtype=np.int16)
+        self.offsets = np.asarray(offsets, dtype=np.int32)
+        if durations is None:
+            durations = np.full(len(self.offsets) - 1, 4.0)
+        self.durations = np.asarray(durations, dtype=np.float32)
+        if len(self.durations) != len(self.offsets) - 1:
+            error = "VoicedProgression needs one duration per chord."
+            raise ValueError(error)
+
+    '''
+    Builds a VoicedProgression from a list of voicings, as produceAllNotes returns them.
+    durations: quarter notes of every chord; a whole note each if None.
+    '''
+    @classmethod
+    def fromLists(cls, voicings, durations=None):
+        voicings = list(voicings)
+        offsets = np.zeros(len(voicings) + 1, dtype=np.int32)
+        np.cumsum([len(voicing) for voicing in voicings], out=offsets[1:])
+        notes = np.fromiter((note for voicing in voicings for note in voicing), dtype=np.int16, count=offsets[-1])
+        return cls(notes, offsets, durations)
+
+    # One progression playing the given ones back to back
+    @classmethod
+    def concatenate(cls, progressions):
+        progressions = list(progressions)
+        notes = np.concatenate([progression.notes for progression in progressions])
+        starts = np.cumsum([0] + [len(progression.notes) for progression in progressions[:-1]])
+        offsets = np.concatenate([progression.offsets[:-1] + start for progression, start in zip(progressions, starts)] + [[len(notes)]])
+        durations = np.concatenate([progression.durations for progression in progressions])
+        return cls(notes, offsets, durations)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    # A view of the notes of chord i; writing to it writes to the progression
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("chord index out of range")
+        return self.notes[self.offsets[i]:self.offsets[i + 1]]
+
+    def __iter__(self):
+        for start, stop in zip(self.offsets[:-1], self.offsets[1:]):
+            yield self.notes[start:stop]
+
+    def __eq__(self, other):
+        if not isinstance(other, VoicedProgression):
+            return NotImplemented
+        return (np.array_equal(self.notes, other.notes) and np.array_equal(self.offsets, other.offsets)
+                and np.array_equal(self.durations, other.durations))
+
+    def __repr__(self):
+        return f"VoicedProgression({self.tolist()!r})"
+
+    # Plain lists of ints, as produceAllNotes returns them
+    def tolist(self):
+        return [chord.tolist() for chord in self]
+
+    # Bytes used by the three arrays
+    @property
+    def nbytes(self):
+        return self.notes.nbytes + self.offsets.nbytes + self.durations.nbytes
+
+    # Time every chord starts at, in quarter notes
+    def onsets(self):
+        onsets = np.zeros(len(self), dtype=np.float64)
+        np.cumsum(self.durations[:-1], out=onsets[1:])
+        return onsets
+
+    '''
+    Piano roll: a boolean (pitch, step) array, True where a note sounds.
+    params:
+        steps_per_quarter: time resolution.
+        lowest, highest: midi range of the rows, both included; row 0 is lowest.
+    '''
+    def pianoRoll(self, steps_per_quarter=4, lowest=0, highest=127):
+        onsets = self.onsets()
+        starts = np.round(onsets * steps_per_quarter).astype(np.int64)
+        stops = np.round((onsets + self.durations) * steps_per_quarter).astype(np.int64)
+        length = int(stops[-1]) if len(self) else 0
+
+        # +1 where a note starts and -1 where it stops, summed along time
+        chord_of_note = np.repeat(np.arange(len(self)), np.diff(self.offsets))
+        inside = (self.notes >= lowest) & (self.notes <= highest)
+        rows = self.notes[inside].astype(np.int64) - lowest
+        changes = np.zeros((highest - lowest + 1, length + 1), dtype=np.int32)
+        np.add.at(changes, (rows, starts[chord_of_note[inside]]), 1)
+        np.add.at(changes, (rows, stops[chord_of_note[inside]]), -1)
+        return np.cumsum(changes, axis=1)[:, :length] > 0
+
+    '''
+    One MIDI track with every chord struck together and held for its duration.
+    '''
+    def midiTrack(self, ticks_per_beat=480, velocity=90, channel=0, tempo=500000):
+        track = mido.MidiTrack()
+        track.append(mido.MetaMessage('set_tempo', tempo=tempo, time=0))
+        # ticks since the last message, carried over chords without notes
+        pending = 0
+        for chord, duration in zip(self, self.durations):
+            notes = chord.tolist()
+            pending += int(round(float(duration) * ticks_per_beat))
+            if not notes:
+                continue
+            ticks = int(round(float(duration) * ticks_per_beat))
+            for i, note in enumerate(notes):
+                track.append(mido.Message('note_on', channel=channel, note=note, velocity=velocity, time=pending - ticks if i == 0 else 0))
+            for i, note in enumerate(notes):
+                track.append(mido.Message('note_off', channel=channel, note=note, velocity=0, time=ticks if i == 0 else 0))
+            pending = 0
+        track.append(mido.MetaMessage('end_of_track', time=pending))
+        return track
+
+    def writeMidi(self, filename, ticks_per_beat=480, velocity=90):
+        if mido is None:
+            self.toStream().write("midi", filename)
+            return
+        midi_file = mido.MidiFile(ticks_per_beat=ticks_per_beat)
+        midi_file.tracks.append(self.midiTrack(ticks_per_beat, velocity))
+        midi_file.save(filename)
+
+    # A music21 stream of chords, for notation
+    def toStream(self):
+        from music21 import chord, duration, stream
+
+        music_stream = stream.Stream()
+        for notes, quarter_length in zip(self, self.durations):
+            music_stream.append(chord.Chord(notes.tolist(), duration=duration.Duration(float(quarter_length))))
+        return music_stream
@@ -0,0 +1,81 @@
+import numpy as np
+import json
+import os
+
+'''
+Precomputed voicing index.
+
+Every voicing of a (root pitch class, chord type, mode) entry is stored as a row of a uint8 array.
+All rows live in one flat array, notes.npy, and table.npy holds the offset, row count and row width of each entry.
+Rows narrower than their entry are padded with 0, which is never a valid note.
+keys.json maps the entry keys to their row in the table, and records the note range and the voicing library (its
+digest, see modules/voicingLibrary.py) the index was built for.
+
+The .npy files are opened memory-mapped, so loading is O(1) and the pages are shared between processes.
+'''
+
+NOTES_FILE = "notes.npy"
+TABLE_FILE = "table.npy"
+KEYS_FILE = "keys.json"
+
+
+def indexKey(pitch_class, chord_type, mode):
+    return f"{pitch_class}|{chord_type}|{mode}"
+
+
+'''
+Writes an index to the given directory.
+params:
+    path: directory to write the bundle into; created if missing.
+    entries: dictionary mapping indexKey() strings to lists of voicings (lists of midi values).
+    note_range: (lowest, highest) midi values the voicings were enumerated with.
+    library: digest of the voicing library the voicings come from.
+'''
+def writeVoicingIndex(path, entries, note_range, library=None):
+    os.makedirs(path, exist_ok=True)
+
+    keys = {}
+    table = np.zeros((len(entries), 3), dtype=np.int64)
+    blocks = []
+    offset = 0
+    for row, (key, voicings) in enumerate(entries.items()):
+        width = max((len(voicing) for voicing in voicings), default=0)
+        block = np.zeros((len(voicings), width), dtype=np.uint8)
+        for i, voicing in enumerate(voicings):
+            block[i, :len(voicing)] = voicing
+
+        keys[key] = row
+        table[row] = (offset, len(voicings), width)
+        blocks.append(block.ravel())
+        offset += block.size
+
+    notes = np.concatenate(blocks) if blocks else np.zeros(0, dtype=np.uint8)
+    np.save(os.path.join(path, NOTES_FILE), notes)
+    np.save(os.path.join(path, TABLE_FILE), table)
+    with open(os.path.join(path, KEYS_FILE), 'w') as file:
+        json.dump({"range": list(note_range), "library": library, "keys": keys}, file)
+
+
+class VoicingIndex:
+    def __init__(self, path):
+        self.path = path
+        self.notes = np.load(os.path.join(path, NOTES_FILE), mmap_mode='r')
+        self.table = np.load(os.path.join(path, TABLE_FILE), mmap_mode='r')
+        with open(os.path.join(path, KEYS_FILE), 'r') as file:
+            meta = json.load(file)
+        self.note_range = tuple(meta["range"])
+        self.library = meta.get("library")
+        self.keys = meta["keys"]
+
+    def __contains__(self, key):
+        return key in self.keys
+
+    '''
+    Returns the voicings of an entry as a (count, width) view into the mapped notes, or None if the entry is not indexed.
+    '''
+    def lookup(self, key):
+        row = self.keys.get(key)
+        if row is None:
+            return None
+        offset, count, width = (int(value) for value in self.table[row])
+        return self.notes[offset:offset + count * width].reshape(count, width)
@@ -0,0 +1,102 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+
+'''
+Voicing library.
+
+The chord formulas and the "jazz" / "rootless" voicing structures live in voicingLibrary.json, next to this file, so
+voicings can be added without touching the code. The file is read once, at import, and every mode's structures are
+compiled into one int16 array of intervals above the root, a structure per row, padded with -1 to the widest one.
+The rows of a voicing family are contiguous, and every chord type is mapped to its family up front, so finding the
+structures of a chord is two dictionary lookups instead of substring scans over the chord type.
+
+The file has:
+    chord_formulas: intervals above the root of every chord type.
+    family_rules: [substring, family] pairs, in matching order; a chord type belongs to the family of the first
+                  substring it contains.
+    voicings: for every mode, the structures of every family.
+    sources: where the voicings come from.
+
+digest, a hash of the file, names the library that cached solutions and voicing indexes were built from.
+'''
+
+LIBRARY_PATH = os.path.join(os.path.dirname(__file__), "voicingLibrary.json")
+
+PADDING = -1
+
+
+class VoicingLibrary:
+    def __init__(self, path=LIBRARY_PATH):
+        with open(path, 'rb') as file:
+            contents = file.read()
+        data = json.loads(contents)
+
+        self.path = path
+        self.digest = hashlib.sha256(contents).hexdigest()[:16]
+        self.chord_formulas = {chord_type: list(intervals) for chord_type, intervals in data["chord_formulas"].items()}
+        self.family_rules = [tuple(rule) for rule in data["family_rules"]]
+        self.families = list(dict.fromkeys(family for _, family in self.family_rules))
+        self.sources = data.get("sources", {})
+
+        # per mode: the structures, their widths, and the (start, stop) rows of every family
+        self.rows = {}
+        self.widths = {}
+        self.family_rows = {}
+        for mode, families in data["voicings"].items():
+            structures = [structure for family in families.values() for structure in family]
+            width = max(len(structure) for structure in structures)
+            self.rows[mode] = np.array([structure + [PADDING] * (width - len(structure)) for structure in structures], dtype=np.int16)
+            self.widths[mode] = np.array([len(structure) for structure in structures], dtype=np.int16)
+            self.family_rows[mode] = {}
+            start = 0
+            for family, family_structures in families.items():
+                self.family_rows[mode][family] = (start, start + len(family_structures))
+                start += len(family_structures)
+
+        self.quality_families = {}
+        for chord_type in self.chord_formulas:
+            try:
+                self.family(chord_type)
+            except ValueError:
+                pass
+
+    '''
+    Name of the voicing family that fits the chord type. Chord types outside chord_formulas are matched on first use
+    and remembered.
+    '''
+    def family(self, chord_type):
+        family = self.quality_families.get(chord_type)
+        if family is not None:
+            return family
+        for substring, family in self.family_rules:
+            if substring in chord_type:
+                self.quality_families[chord_type] = family
+                return family
+        error = "Ooh I have not thought that far in"
+        raise ValueError(error)
+
+    '''
+    Rows, as a (structures, widths) pair of arrays, of the family of a mode.
+    '''
+    def familyArrays(self, mode, family):
+        start, stop = self.family_rows[mode][family]
+        return self.rows[mode][start:stop], self.widths[mode][start:stop]
+
+    '''
+    Structures of the family of a mode, as lists of intervals.
+    '''
+    def structures(self, mode, family):
+        rows, widths = self.familyArrays(mode, family)
+        return [row[:width].tolist() for row, width in zip(rows, widths)]
+
+    '''
+    Every family of a mode, as a {family: structures} dictionary.
+    '''
+    def asDict(self, mode):
+        return {family: self.structures(mode, family) for family in self.family_rows[mode]}
+
+
+VOICING_LIBRARY = VoicingLibrary()
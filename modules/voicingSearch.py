@@ -0,0 +1,124 @@
+import heapq
+import itertools
+
+'''
+Top-k voicings by best-first search.
+
+A voicing takes one note from the domain of every chord role, from the root up, in strictly ascending order,
+optionally with the root doubled an octave below as a bass note. Partial voicings wait in a priority queue ordered by
+a lower bound of the cost of any voicing that completes them; complete voicings are queued with their exact cost.
+A complete voicing popped from the queue is therefore cheaper than anything still queued, and the search stops
+after k of them, without enumerating the whole space.
+'''
+
+
+'''
+Cost of a voicing, the sum of weighted terms:
+    register: distance of every note from centre (a midi value).
+    spread: distance from the lowest to the highest note.
+    doubled_root: every root pitch class note beyond the first.
+    motion: distance from the previous chord, as in modules/voiceLeading.py: every note of either chord to the
+            nearest note of the other one.
+
+Subclasses can change cost; lowerBound must then stay at or below the cost of every completion of the partial
+voicing, or the search loses its guarantee. Weights must not be negative.
+'''
+class VoicingCost:
+    def __init__(self, centre=60, register=0.1, spread=0.2, doubled_root=2.0, motion=1.0):
+        self.centre = centre
+        self.register = register
+        self.spread = spread
+        self.doubled_root = doubled_root
+        self.motion = motion
+
+    def cost(self, notes, root_pitch_class, previous=None):
+        total = self.register * sum(abs(note - self.centre) for note in notes)
+        total += self.spread * (max(notes) - min(notes))
+        total += self.doubled_root * max(sum(1 for note in notes if note % 12 == root_pitch_class) - 1, 0)
+        if previous:
+            total += self.motion * (sum(_nearest(note, previous) for note in notes) + sum(_nearest(note, notes) for note in previous))
+        return total
+
+    '''
+    Lower bound of the cost of every voicing that completes notes (ascending, not empty) with one note from each of
+    remaining_domains, each above the one before. The previous chord's distance to the voicing counts as 0.
+    '''
+    def lowerBound(self, notes, remaining_domains, root_pitch_class, previous=None):
+        bound = self.register * sum(abs(note - self.centre) for note in notes)
+        bound += self.spread * (notes[-1] - notes[0] + len(remaining_domains))
+        bound += self.doubled_root * max(sum(1 for note in notes if note % 12 == root_pitch_class) - 1, 0)
+        if previous:
+            bound += self.motion * sum(_nearest(note, previous) for note in notes)
+        for domain in remaining_domains:
+            candidates = [note for note in domain if note > notes[-1]]
+            if not candidates:
+                return float("inf")
+            note_bounds = [self.register * abs(note - self.centre) + (self.motion * _nearest(note, previous) if previous else 0)
+                           for note in candidates]
+            bound += min(note_bounds)
+        return bound
+
+
+'''
+The k cheapest voicings, cheapest first.
+params:
+    domains: list with the candidate midi values of every chord role, root first.
+    k: number of voicings wanted.
+    cost: a VoicingCost.
+    root_pitch_class: pitch class of the chord root, 0-11.
+    previous: notes of the previous chord, or None.
+    max_spread: largest gap between neighbor notes, or None for no limit.
+    min_sum: smallest sum of the role notes (the bass note excluded), or None.
+    bass_range: (lowest, highest) midi values the doubled bass must lie in; None never doubles the bass.
+
+returns:
+    list of (cost, notes) tuples, notes ascending, and the number of partial voicings expanded.
+'''
+def topVoicings(domains, k, cost, root_pitch_class, previous=None, max_spread=12, min_sum=None, bass_range=None):
+    domains = [sorted(domain) for domain in domains]
+    # largest sum the remaining roles can add, to prune voicings that can no longer reach min_sum
+    remaining_max = [sum(domain[-1] for domain in domains[i:]) for i in range(len(domains) + 1)]
+    counter = itertools.count()
+
+    queue = []
+    for note in domains[0]:
+        notes = (note,)
+        heapq.heappush(queue, (cost.lowerBound(notes, domains[1:], root_pitch_class, previous), next(counter), False, notes))
+
+    results = []
+    expanded = 0
+    while queue and len(results) < k:
+        value, _, complete, notes = heapq.heappop(queue)
+        if value == float("inf"):
+            break
+        if complete:
+            results.append((value, list(notes)))
+            continue
+
+        expanded += 1
+        depth = len(notes)
+        if depth == len(domains):
+            # every role is placed; the complete voicings are this one and, if allowed, the one with a doubled bass
+            completions = [notes]
+            if bass_range is not None and bass_range[0] <= notes[0] - 12 <= bass_range[1]:
+                completions.append((notes[0] - 12,) + notes)
+            for completion in completions:
+                heapq.heappush(queue, (cost.cost(completion, root_pitch_class, previous), next(counter), True, completion))
+            continue
+
+        for note in domains[depth]:
+            if note <= notes[-1]:
+                continue
+            if max_spread is not None and note - notes[-1] > max_spread:
+                break
+            extended = notes + (note,)
+            if min_sum is not None and sum(extended) + remaining_max[depth + 1] < min_sum:
+                continue
+            bound = cost.lowerBound(extended, domains[depth + 1:], root_pitch_class, previous)
+            heapq.heappush(queue, (bound, next(counter), False, extended))
+
+    return results, expanded
+
+
+def _nearest(note, notes):
+    return min(abs(note - other) for other in notes)
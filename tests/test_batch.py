@@ -0,0 +1,68 @@
+import json
+import os
+import random
+
+import pytest
+
+from modules.noteSolver import *
+
+
+@pytest.fixture
+def disk_cache(tmp_path):
+    path = str(tmp_path / "solutions.json")
+    useDiskCache(path)
+    SOLUTION_CACHE.clear()
+    yield path
+    SOLUTION_CACHE.path = None
+    SOLUTION_CACHE.stored = {}
+    SOLUTION_CACHE.dirty = False
+    SOLUTION_CACHE.clear()
+
+
+def jazzProgressions(count, seed=0):
+    rng = random.Random(seed)
+    roots = ["C", "Db", "D", "Eb", "E", "F", "F#", "G", "Ab", "A", "Bb", "B"]
+    types = ["maj7", "min7", "7", "dim"]
+    return [[f"{rng.choice(roots)}:{rng.choice(types)}" for _ in range(4)] for _ in range(count)]
+
+
+def testBatchWithDiskCache(disk_cache):
+    progressions = jazzProgressions(60)
+    results = produceAllNotesBatch(progressions, "jazz", workers=4, chunksize=1, fallback=True)
+
+    assert len(results) == len(progressions)
+    assert all(len(voiced) == 4 for voiced in results)
+
+    # every chord the workers solved is in the store, written once by this process
+    with open(disk_cache) as file:
+        stored = json.load(file)
+    chords = set(chord for progression in progressions for chord in progression)
+    assert set(SOLUTION_CACHE.key(chord, "jazz") for chord in chords) <= set(stored)
+    assert [name for name in os.listdir(os.path.dirname(disk_cache)) if name.endswith(".tmp")] == []
+
+
+def testBatchReusesDiskCache(disk_cache):
+    progressions = jazzProgressions(20, seed=1)
+    produceAllNotesBatch(progressions, "jazz", workers=2, chunksize=1)
+
+    # a new run starts from the stored entries, and stores nothing new
+    useDiskCache(disk_cache)
+    SOLUTION_CACHE.clear()
+    mtime = os.path.getmtime(disk_cache)
+    produceAllNotesBatch(progressions, "jazz", workers=2, chunksize=1)
+    assert os.path.getmtime(disk_cache) == mtime
+
+
+# entries stored with another voicing library are not served, and are dropped from the store
+def testDiskCacheIgnoresOtherLibrary(disk_cache, monkeypatch):
+    monkeypatch.setattr(VOICING_LIBRARY, "digest", "edited")
+    stale_key = SOLUTION_CACHE.key("C:maj7", "jazz")
+    SOLUTION_CACHE.put(stale_key, [(1, 2, 3)])
+    SOLUTION_CACHE.flush()
+    monkeypatch.undo()
+
+    useDiskCache(disk_cache)
+    SOLUTION_CACHE.clear()
+    assert SOLUTION_CACHE.get(SOLUTION_CACHE.key("C:maj7", "jazz")) is None
+    assert SOLUTION_CACHE.get(stale_key) is None
+    assert [1, 2, 3] not in [list(solution) for solution in enumerateSolutions("C:maj7", "jazz")]
@@ -0,0 +1,103 @@
+import random
+
+import mido
+import pytest
+
+from modules.liveVoicer import LiveVoicer, identifyChord, midiChordSymbols
+
+
+class RecordingPort:
+    def __init__(self):
+        self.sent = []
+
+    def send(self, message):
+        self.sent.append(message)
+
+
+# Block chords, notes struck a millisecond apart, each held for a second
+def blockChordMessages(chords):
+    messages = []
+    for notes in chords:
+        for i, note in enumerate(notes):
+            messages.append(mido.Message('note_on', note=note, velocity=80, time=0.001 if i else 0))
+        for i, note in enumerate(notes):
+            messages.append(mido.Message('note_off', note=note, velocity=0, time=1.0 if i == 0 else 0))
+    return messages
+
+
+CHORDS = [[50, 53, 57, 60], [55, 59, 62, 65], [48, 52, 55, 59]]
+
+
+def testIdentifyChord():
+    assert identifyChord([50, 53, 57, 60]) == "D:min7"
+    assert identifyChord([55, 59, 62, 65]) == "G:7"
+    assert identifyChord([60, 61, 62]) is None
+
+
+def testBlockChordsAreNotSplit():
+    assert list(midiChordSymbols(blockChordMessages(CHORDS))) == ["D:min7", "G:7", "C:maj7"]
+
+
+def testHeldChordSettles():
+    # no release: the chord is emitted once nothing is added for the settle window, before the next chord
+    messages = [mido.Message('note_on', note=note, velocity=80, time=0) for note in [50, 53, 57]]
+    messages.append(mido.Message('note_on', note=60, velocity=80, time=0.5))
+    assert list(midiChordSymbols(messages)) == ["D:min", "D:min7"]
+
+
+def testTextMetaMessages():
+    messages = [mido.MetaMessage('marker', text="Dm7"), mido.MetaMessage('text', text=" ")] + blockChordMessages(CHORDS[1:2])
+    assert list(midiChordSymbols(messages)) == ["Dm7", "G:7"]
+
+
+def expectedMessages(voicings):
+    expected = []
+    sounding = []
+    for notes in voicings:
+        expected += [('note_off', note) for note in sounding]
+        expected += [('note_on', note) for note in notes]
+        sounding = notes
+    return expected + [('note_off', note) for note in sounding]
+
+
+def streamFrom(messages):
+    voicer = LiveVoicer(mode="simple", time_budget=1.0, rng=random.Random(0))
+    output = RecordingPort()
+    voiced = list(voicer.stream(midiChordSymbols(messages), output))
+    return voiced, output
+
+
+def testStreamFromMessages():
+    voiced, output = streamFrom(blockChordMessages(CHORDS))
+
+    assert [chord for chord, notes, messages in voiced] == ["D:min7", "G:7", "C:maj7"]
+    voicings = [notes for chord, notes, messages in voiced]
+    # every chord releases the one before, and the last one is released on exit by allNotesOff
+    assert [(message.type, message.note) for message in output.sent] == expectedMessages(voicings)
+    assert all(message.velocity == 0 for message in output.sent if message.type == 'note_off')
+
+
+def testStreamFromMidiFile(tmp_path):
+    midi_file = mido.MidiFile()
+    track = mido.MidiTrack()
+    midi_file.tracks.append(track)
+    ticks_per_second = midi_file.ticks_per_beat * 2
+    for message in blockChordMessages(CHORDS):
+        track.append(message.copy(time=int(round(message.time * ticks_per_second))))
+    path = tmp_path / "chords.mid"
+    midi_file.save(path)
+
+    voiced, output = streamFrom(mido.MidiFile(path))
+    assert [chord for chord, notes, messages in voiced] == ["D:min7", "G:7", "C:maj7"]
+    assert [(message.type, message.note) for message in output.sent] == expectedMessages([notes for _, notes, _ in voiced])
+
+
+def testStreamSendsAllNotesOffWhenStopped():
+    voicer = LiveVoicer(mode="simple", time_budget=1.0, rng=random.Random(0))
+    output = RecordingPort()
+    stream = voicer.stream(["D:min7", "G:7"], output)
+    chord, notes, messages = next(stream)
+    stream.close()
+
+    assert [(message.type, message.note) for message in output.sent] == expectedMessages([notes])
+    assert voicer.sounding == []
@@ -0,0 +1,180 @@
+import itertools
+import random
+
+import pytest
+
+from modules.noteSolver import *
+
+ROOT_SPELLINGS = INDEX_ROOTS + ["Db", "D#", "Gb", "G#", "A#", "Cb", "E#"]
+RELAXATIONS = [(), ("widen_range",), ("drop_spread",), ("widen_range", "drop_spread")]
+
+
+def cspVoicings(current_chord, mode, chord_structure, relaxations, profile=None):
+    problem, note_vars = buildProblem(current_chord, [], mode, chord_structure, relaxations=relaxations, profile=profile)
+    return formatSolutions(problem.getSolutions(), mode)
+
+
+# structureVoicing and structureVoicings build the jazz and rootless voicings in closed form; they must agree with
+# the CSP of buildProblem for every structure, root spelling and relaxation
+@pytest.mark.parametrize("mode", ["jazz", "rootless"])
+@pytest.mark.parametrize("relaxations", RELAXATIONS)
+def testStructureVoicingsMatchCSP(mode, relaxations):
+    for family, root in itertools.product(VOICING_LIBRARY.family_rows[mode], ROOT_SPELLINGS):
+        current_chord = f"{root}:{family}"
+        expected = []
+        for chord_structure in VOICING_LIBRARY.structures(mode, family):
+            solutions = cspVoicings(current_chord, mode, chord_structure, relaxations)
+            assert len(solutions) <= 1
+            notes = structureVoicing(current_chord, mode, chord_structure, relaxations)
+            closed_form = [sorted(notes)[1:] if mode == "rootless" else sorted(notes)] if notes is not None else []
+            assert closed_form == solutions, (current_chord, chord_structure)
+            if notes is not None:
+                expected.append(notes)
+
+        assert structureVoicings(current_chord, mode, family, relaxations) == expected, current_chord
+
+
+@pytest.mark.parametrize("profile", ["piano_lh", "piano_rh", "guitar"])
+def testStructureVoicingsMatchCSPInProfiles(profile):
+    for mode, root in itertools.product(["jazz", "rootless"], INDEX_ROOTS):
+        for family in VOICING_LIBRARY.family_rows[mode]:
+            current_chord = f"{root}:{family}"
+            expected = []
+            for chord_structure in VOICING_LIBRARY.structures(mode, family):
+                solutions = cspVoicings(current_chord, mode, chord_structure, (), profile)
+                notes = structureVoicing(current_chord, mode, chord_structure, (), profile)
+                closed_form = [sorted(notes)[1:] if mode == "rootless" else sorted(notes)] if notes is not None else []
+                assert closed_form == solutions, (current_chord, chord_structure, profile)
+                if notes is not None:
+                    expected.append(notes)
+            assert structureVoicings(current_chord, mode, family, (), profile) == expected
+
+
+@pytest.mark.parametrize("mode", ["simple", "jazz", "rootless", "smooth", "ranked", "voiceleading", "satb", "auto"])
+def testProduceNotesWithoutPreviousChord(mode):
+    for notes_so_far in [None, [], ()]:
+        notes = produceNotes("C:maj7", notes_so_far, mode, rng=random.Random(0))
+        assert notes and all(isinstance(note, int) for note in notes)
+    assert produceNotes("D:min7", ([60, 64, 67, 71],), mode, rng=random.Random(0))
+
+
+def testProduceAllNotesReportsStatuses():
+    progression = ["C:maj7", "A:min7", "D:min7", "G:7"]
+    statuses = []
+    notes = produceAllNotes(progression, "simple", [], rng=random.Random(0), time_budget=10, statuses=statuses)
+    assert isinstance(notes, list) and len(notes) == len(progression)
+    assert statuses == ["optimal"] * len(progression)
+
+    statuses = []
+    notes = produceAllNotes(progression, "smooth", [], rng=random.Random(0), time_budget=0, statuses=statuses)
+    assert len(notes) == len(statuses) == len(progression)
+    assert set(statuses) <= {"budget", "fallback"}
+
+    statuses = []
+    produceAllNotes(progression, "simple", [], rng=random.Random(0), previous_result=notes, edited={2}, statuses=statuses)
+    assert statuses[:2] == ["reused", "reused"] and statuses[2] == "optimal"
+
+
+# auto takes the status of the mode that won the race
+def testRaceModesReportsFallbackWinner(monkeypatch):
+    import modules.noteSolver as noteSolver
+
+    def fakeProduceNotes(current_chord, notes_so_far, mode, record=None, **kwargs):
+        record["status"] = "fallback" if mode == "simple" else "optimal"
+        return [48, 52, 55, 59] if mode == "simple" else [0, 127]
+
+    monkeypatch.setattr(noteSolver, "produceNotes", fakeProduceNotes)
+    record = {}
+    assert raceModes("C:maj7", [], rng=random.Random(0), record=record) == [[48, 52, 55, 59]]
+    assert record["winner"] == "simple" and record["status"] == "fallback"
+
+
+# a deterministic failure is tried once per relaxation, not retried
+def testFallbackDoesNotRetryDeterministicFailures(caplog):
+    stats = SolverStats()
+    with caplog.at_level("WARNING", logger="modules.noteSolver"):
+        notes, relaxation = produceAllNotesWithFallback(["C:aug", "F:maj7"], "jazz", ["2", "2"], stats=stats)
+    assert relaxation == "simple" and len(notes) == 2
+    assert stats.retries == len(caplog.records) == [name for name, _ in RELAXATION_LADDER].index("simple")
+
+    assert isRandomizedStep("smooth", [])
+    assert isRandomizedStep("custom", ["1", "4"])
+    assert isRandomizedStep("simple", [], ("simple",), streaming=True)
+    assert not isRandomizedStep("smooth", [], ("simple",))
+    assert not isRandomizedStep("jazz", [])
+
+
+# falling back to simple mode keeps the normal range and spread for the chords that fit them
+def testSimpleFallbackStaysInRange():
+    progression = ["A:min7", "Bb:9", "E:7", "A:maj7"]
+    notes, relaxation = produceAllNotesWithFallback(progression, "jazz", ["2"] * len(progression))
+    assert relaxation == "simple"
+    lowest_note, highest_note = noteRange()
+    for chord_notes in notes:
+        chord_notes = sorted(chord_notes)
+        assert lowest_note <= chord_notes[0] and chord_notes[-1] <= highest_note
+        assert all(n2 - n1 <= 12 for n1, n2 in zip(chord_notes, chord_notes[1:]))
+
+
+# in smooth mode an edit stops propagating once the next previous voicing still fits the new one
+def testSmoothEditStopsPropagating(monkeypatch):
+    import modules.noteSolver as noteSolver
+
+    progression = ["C:maj7", "A:min7", "D:min7", "G:7"] * 4
+    previous_result = produceAllNotes(progression, "smooth", [], rng=random.Random(0))
+    edited_progression = list(progression)
+    edited_progression[3] = "G:9"
+
+    solved = []
+    original = noteSolver.produceNotes
+
+    def countingProduceNotes(current_chord, *args, **kwargs):
+        solved.append(current_chord)
+        return original(current_chord, *args, **kwargs)
+
+    monkeypatch.setattr(noteSolver, "produceNotes", countingProduceNotes)
+    notes = produceAllNotes(edited_progression, "smooth", [], rng=random.Random(1), previous_result=previous_result, edited=[3])
+    assert 1 <= len(solved) < 4
+    assert notes[:3] == previous_result[:3] and notes[3 + len(solved):] == previous_result[3 + len(solved):]
+    assert all(sectionEntryFits("smooth", previous, None, current) for previous, current in zip(notes, notes[1:]))
+
+
+# an index built from another voicing library is ignored
+def testVoicingIndexIgnoresOtherLibrary(tmp_path, monkeypatch):
+    import modules.noteSolver as noteSolver
+
+    key = indexKey(0, "maj7", "simple")
+    path = str(tmp_path / "index")
+    writeVoicingIndex(path, {key: [[36, 48, 52, 55, 59]]}, (LOWEST_NOTE, HIGHEST_NOTE), "edited")
+    monkeypatch.setattr(noteSolver, "VOICING_INDEX", None)
+    useVoicingIndex(path)
+    assert lookupVoicingIndex("C:maj7", "simple") is None
+
+    writeVoicingIndex(path, {key: [[36, 48, 52, 55, 59]]}, (LOWEST_NOTE, HIGHEST_NOTE), VOICING_LIBRARY.digest)
+    useVoicingIndex(path)
+    assert lookupVoicingIndex("C:maj7", "simple").tolist() == [[36, 48, 52, 55, 59]]
+
+
+# every stats record written says which attempt at its relaxation step it belongs to
+def testStatsRecordAttempts(tmp_path, monkeypatch):
+    import json
+    import modules.noteSolver as noteSolver
+
+    original = noteSolver.produceAllNotes
+    calls = []
+
+    def failingOnce(*args, **kwargs):
+        notes = original(*args, **kwargs)
+        calls.append(notes)
+        if len(calls) == 1:
+            raise ValueError("no path")
+        return notes
+
+    monkeypatch.setattr(noteSolver, "produceAllNotes", failingOnce)
+    stats = SolverStats()
+    produceAllNotesWithFallback(["C:maj7", "A:min7", "D:min7"], "smooth", [], stats=stats)
+    path = tmp_path / "stats.jsonl"
+    stats.write_jsonl(str(path))
+    records = [json.loads(line) for line in path.read_text().splitlines()]
+    assert stats.retries == 1
+    assert [(record["relaxation"], record["attempt"]) for record in records] == [("none", 1)] * 3 + [("none", 2)] * 3
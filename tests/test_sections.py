@@ -0,0 +1,26 @@
+from modules.sections import *
+
+A = [["C:maj7"], ["A:min7"], ["D:min7"], ["G:7"], ["E:min7"], ["A:7"], ["D:min7"], ["G:7"]]
+B = [["F:maj7"], ["F:min7"], ["E:min7"], ["A:7"], ["D:min7"], ["D:min7"], ["A:min7"], ["G:7"]]
+
+
+def testSectionsFromForm():
+    assert sectionsFromForm("AABA", 32) == [("A", 0, 8), ("A", 8, 16), ("B", 16, 24), ("A", 24, 32)]
+
+
+def testDetectAABA():
+    # B ends on the same bar as A, which must not shift the sections by a bar
+    assert detectSections(A + A + B + A) == [("A", 0, 8), ("A", 8, 16), ("B", 16, 24), ("A", 24, 32)]
+
+
+def testDetectVerseChorus():
+    assert [label for label, start, stop in detectSections(A + B + A + B + B)] == ["A", "B", "A", "B", "B"]
+
+
+def testDetectNoRepeat():
+    assert detectSections(A + B) == [("A", 0, 16)]
+
+
+def testSectionChordSpans():
+    bars = [["D:min7", "G:7"], ["C:maj7"], ["A:min7"], ["D:min7", "G:7"]]
+    assert sectionChordSpans(sectionsFromForm("AB", 4), bars) == [("A", 0, 3), ("B", 3, 6)]
@@ -0,0 +1,40 @@
+import numpy as np
+
+from modules.noteSolver import *
+from modules.voiceLeading import TransitionCache, distanceMatrix
+
+
+def motion(previous, current):
+    return sum(min(abs(note - other) for other in current) for note in previous) + \
+           sum(min(abs(note - other) for other in previous) for note in current)
+
+
+def testDistanceMatrix():
+    rng = np.random.default_rng(0)
+    for p, q in [(3, 4), (5, 6), (4, 4), (1, 3)]:
+        previous = rng.integers(30, 90, (20, p))
+        current = rng.integers(30, 90, (25, q))
+        expected = [[motion(a, b) for b in current] for a in previous]
+        assert distanceMatrix(previous, current).tolist() == expected
+
+
+def testVoiceLeadingCandidatesAreCapped():
+    candidates = candidateVoicings("C:13", ("widen_range", "drop_spread"))
+    assert len(candidates) == MAX_VOICELEADING_CANDIDATES
+    notes = produceAllNotes(["C:13", "F:13", "Bb:13"], "voiceleading", [], ("widen_range", "drop_spread"))
+    assert len(notes) == 3
+
+
+def testTransitionCacheIsBoundedByBytes():
+    voicings = np.arange(400).reshape(100, 4) % 80 + 30
+    cache = TransitionCache(max_bytes=3 * 100 * 100 * 4)
+    for key in range(5):
+        matrix = cache.matrix(key, key + 1, voicings, voicings)
+        assert matrix.shape == (100, 100)
+        assert cache.nbytes == sum(entry.nbytes for entry in cache.entries.values()) <= cache.max_bytes
+    assert list(cache.entries) == [(2, 3), (3, 4), (4, 5)]
+
+    # a matrix larger than the whole budget is not kept
+    cache = TransitionCache(max_bytes=100)
+    cache.matrix("a", "b", voicings, voicings)
+    assert cache.stats()["entries"] == 0 and cache.nbytes == 0